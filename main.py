@@ -1,15 +1,37 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from typing import Literal
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
-from strawberry.fastapi import GraphQLRouter
 from strawberry.subscriptions import GRAPHQL_TRANSPORT_WS_PROTOCOL, GRAPHQL_WS_PROTOCOL
 
 from src.infrastructure.container import Container
 from src.infrastructure.config.settings import get_settings
 from src.infrastructure.database.session import create_tables
+from src.infrastructure.database.write_behind import write_behind
+from src.infrastructure.observability.logs import (
+    configure_logging,
+    start_logging,
+    stop_logging,
+)
 from src.presentation.graphql.schema import create_schema
+from src.presentation.graphql.router import RequestScopedGraphQLRouter
+from src.presentation.http.avatar import create_avatar_router
+from src.presentation.http.export import create_export_router
+from src.presentation.http.middleware import (
+    SelectiveGZipMiddleware,
+    RequestIdMiddleware,
+)
+from src.presentation.http.profiling import (
+    SamplingProfiler,
+    ProfilingMiddleware,
+    create_profiling_router,
+)
+from src.presentation.http.admission import (
+    AdmissionController,
+    AdmissionControlMiddleware,
+    AdmissionLimiter,
+)
 
 
 def create_app() -> FastAPI:
@@ -18,18 +40,27 @@ def create_app() -> FastAPI:
     # Configurações
     settings = get_settings()
 
+    # Logs estruturados escritos por uma thread em segundo plano
+    configure_logging(
+        level=settings.log_level,
+        format=settings.log_format,
+        queue_size=settings.log_queue_size,
+        rate_limit=settings.log_rate_limit,
+        rate_limit_interval=settings.log_rate_limit_interval_seconds,
+    )
+
     # Container de dependências
     container = Container()
 
-    # Schema GraphQL
-    schema = create_schema()
+    # Schema GraphQL (aceita lotes de até GRAPHQL_MAX_BATCH_SIZE operações)
+    schema = create_schema(settings.graphql_max_batch_size)
 
     # Contexto do GraphQL
     async def get_context():
         return container.graphql_context()
 
-    # GraphQL Router
-    graphql_app = GraphQLRouter(
+    # GraphQL Router (operações da requisição compartilham a sessão do banco)
+    graphql_app = RequestScopedGraphQLRouter(
         schema,
         context_getter=get_context,
         subscription_protocols=[
@@ -37,11 +68,52 @@ def create_app() -> FastAPI:
             GRAPHQL_WS_PROTOCOL,
         ],
         allow_queries_via_get=False,
+        multipart_uploads_enabled=True,
         graphql_ide=None if settings.production else Literal["playground"],
     )
 
     # Aplicação
-    fastapi = FastAPI(debug=settings.debug, on_startup=[create_tables])
+    fastapi = FastAPI(
+        debug=settings.debug,
+        on_startup=[start_logging, create_tables, write_behind.start],
+        on_shutdown=[write_behind.stop, stop_logging],
+    )
+
+    # Profiler por amostragem (apenas fora de produção)
+    profiler = None
+    if settings.profiling_enabled and not settings.production:
+        profiler = SamplingProfiler(
+            output_dir=settings.profiling_output_dir, format=settings.profiling_format
+        )
+        fastapi.add_middleware(
+            ProfilingMiddleware,
+            profiler=profiler,
+            path="/graphql",
+            sample_rate=settings.profiling_sample_rate,
+        )
+
+    # Controle de admissão do GraphQL (descarta carga com 503 + Retry-After)
+    admission = AdmissionController(
+        expensive=AdmissionLimiter(
+            name="expensive",
+            limit=settings.admission_expensive_limit,
+            target=settings.admission_target_ms / 1000,
+            interval=settings.admission_interval_ms / 1000,
+            max_wait=settings.admission_max_wait_ms / 1000,
+            # Cada login ocupa a vaga pelo menos pelo piso de resposta
+            service_time=settings.login_min_response_ms / 1000,
+        ),
+        cheap=AdmissionLimiter(
+            name="cheap",
+            limit=settings.admission_cheap_limit,
+            target=settings.admission_target_ms / 1000,
+            interval=settings.admission_interval_ms / 1000,
+            max_wait=settings.admission_max_wait_ms / 1000,
+        ),
+    )
+    fastapi.add_middleware(
+        AdmissionControlMiddleware, controller=admission, path="/graphql"
+    )
 
     # Configuração CORS
     fastapi.add_middleware(
@@ -57,12 +129,41 @@ def create_app() -> FastAPI:
         TrustedHostMiddleware, allowed_hosts=["localhost", "127.0.0.1"]
     )
 
-    # Configuração de GZip Middleware
-    fastapi.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
+    # Configuração de GZip Middleware (avatares e exportações já decidem a
+    # própria compressão)
+    fastapi.add_middleware(
+        SelectiveGZipMiddleware,
+        excluded_paths=("/avatars", "/admin"),
+        minimum_size=1000,
+        compresslevel=5,
+    )
+
+    # request_id nos logs da requisição (mais externo: cobre os demais)
+    fastapi.add_middleware(RequestIdMiddleware)
 
     # Incluir rota GraphQL
     fastapi.include_router(graphql_app, prefix="/graphql")
 
+    # Incluir rota de avatares
+    fastapi.include_router(
+        create_avatar_router(container.avatar_repository()), prefix="/avatars"
+    )
+
+    # Exportação de usuários e sessões (role admin)
+    fastapi.include_router(create_export_router(settings), prefix="/admin")
+
+    # Amostragem contínua por tempo limitado (role admin)
+    if profiler is not None:
+        fastapi.include_router(
+            create_profiling_router(profiler, settings.profiling_max_seconds, settings),
+            prefix="/debug",
+        )
+
+    # Métricas do controle de admissão
+    @fastapi.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return admission.metrics()
+
     return fastapi
 
 
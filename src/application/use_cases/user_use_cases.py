@@ -1,13 +1,19 @@
-import bcrypt
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from uuid import UUID
+from datetime import datetime, timezone
 from src.domain.entities.user import User
 from src.domain.repositories.user_repository import UserRepository
+from src.domain.repositories.avatar_repository import AvatarRepository
+from src.domain.services.password_service import hash_password
+from src.domain.services.media_type import detect_media_type
 
 
 @dataclass
 class UserUseCases:
     user_repository: UserRepository
+    avatar_repository: AvatarRepository
+    avatar_max_bytes: int = 2 * 1024 * 1024
 
     def create_user(self, user: User) -> bool:
         # Validar campos obrigatórios
@@ -15,9 +21,7 @@ class UserUseCases:
 
         # Hash da senha antes de enviar para o repositório
         if user.password:
-            user.password = bcrypt.hashpw(
-                user.password.encode("utf-8"), bcrypt.gensalt(10)
-            ).decode("utf-8")
+            user.password = hash_password(user.password)
         return self.user_repository.create_user(user)
 
     def auth_login(
@@ -29,3 +33,39 @@ class UserUseCases:
 
     def revoke_session(self, refresh_token: str) -> bool:
         return self.user_repository.revoke_session(refresh_token)
+
+    def revoke_user_tokens(self, user_uuid: UUID) -> bool:
+        # "Sair de todos": uma escrita, sem tocar nas linhas de sessões
+        return self.user_repository.revoke_user_tokens(
+            user_uuid, datetime.now(timezone.utc)
+        )
+
+    def revoke_all_tokens(self, before: Optional[datetime] = None) -> datetime:
+        # Sessões criadas até `before` (agora, por padrão) deixam de valer
+        now = datetime.now(timezone.utc)
+        if before is None:
+            before = now
+        elif before.tzinfo is None:
+            before = before.replace(tzinfo=timezone.utc)
+
+        # Um epoch no futuro bloquearia também os logins até lá
+        if before > now:
+            raise ValueError("A data de revogação não pode estar no futuro")
+
+        return self.user_repository.revoke_all_tokens(before)
+
+    def update_avatar(self, user_uuid: UUID, data: bytes) -> str:
+        # Validar tamanho e formato da imagem
+        if not data:
+            raise ValueError("O arquivo do avatar está vazio")
+
+        if len(data) > self.avatar_max_bytes:
+            raise ValueError("O avatar excede o tamanho máximo permitido")
+
+        if not detect_media_type(data[:12]):
+            raise ValueError("Formato de imagem não suportado")
+
+        # Conteúdo idêntico é armazenado uma única vez
+        avatar_hash = self.avatar_repository.save(data)
+        self.user_repository.update_avatar(user_uuid, avatar_hash)
+        return avatar_hash
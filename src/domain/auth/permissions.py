@@ -1,13 +1,18 @@
+import structlog
 from uuid import UUID
+from datetime import datetime, timezone
 from strawberry.types import Info
 from strawberry.permission import BasePermission
 from fastapi import Request, Response
 from dataclasses import dataclass, field
-from sqlalchemy import select
 from src.infrastructure.database.session import get_session
-from src.infrastructure.database.models import users, sessions
+from src.infrastructure.database import statements
+from src.infrastructure.database.write_behind import write_behind
+from src.infrastructure.database.token_epochs import token_epochs, EPOCH_ZERO
 from src.domain.services.token_service import TokenService
-from src.domain.entities.user import User
+from src.domain.entities.principal import Principal
+
+logger = structlog.get_logger(__name__)
 
 
 @dataclass
@@ -17,6 +22,17 @@ class IsAuthenticated(BasePermission):
 
     def has_permission(self, source: object, info: Info, **kwargs) -> bool:
         context = info.context
+
+        # Operações de um mesmo lote reutilizam o resultado da primeira
+        if context.authenticated is None:
+            context.authenticated = self.authenticate(context)
+            context.auth_message = self.message
+
+        self.message = context.auth_message
+        return context.authenticated
+
+    def authenticate(self, context) -> bool:
+        """Valida os cookies e carrega o usuário atual no contexto"""
         request: Request = context.request
         response: Response = context.response
 
@@ -27,6 +43,7 @@ class IsAuthenticated(BasePermission):
                 context.settings.salt,
                 context.settings.access_token_expires_minutes,
                 context.settings.refresh_token_expires_days,
+                context.settings.fast_token_codec,
             )
 
             # Cookies
@@ -43,6 +60,19 @@ class IsAuthenticated(BasePermission):
                 self.message = "Invalid token"
                 return False
 
+            # Revogação em massa: epoch global em cache, antes de qualquer
+            # consulta ou renovação (o epoch do usuário vem na linha da sessão)
+            if token_epochs.is_revoked(payload):
+                self.message = "Token revoked"
+                response.delete_cookie("x-access-token")
+                response.delete_cookie("x-refresh-token")
+                return False
+
+            # Sessões recém-criadas leem do primário (read-your-writes)
+            use_replica = not token_service.is_recently_issued(
+                payload, context.settings.read_your_writes_seconds
+            )
+
             # Verificar se o access token não expirou
             if not token_service.is_token_valid(payload):
 
@@ -67,6 +97,9 @@ class IsAuthenticated(BasePermission):
                 if not new_access_token:
                     return handle_token_failure("Failed to refresh token")
 
+                # O novo access token acabou de ser gravado no primário
+                use_replica = False
+
                 # Definir o novo cookie do access token
                 response.set_cookie(
                     key="x-access-token",
@@ -96,49 +129,118 @@ class IsAuthenticated(BasePermission):
 
             access_token_hash = token_service.hash_token(access_token_value)
 
-            # Buscar sessão no banco
-            with get_session() as session:
-                base_query = (
-                    select(
-                        users.c.uuid,
-                        users.c.name,
-                        users.c.email,
-                        users.c.role,
-                        users.c.fingerprint,
-                        users.c.status,
-                        users.c.avatar,
-                        users.c.date,
-                    )
-                    .select_from(
-                        users.join(sessions, users.c.uuid == sessions.c.user_uuid)
-                    )
-                    .where(
-                        (users.c.uuid == UUID(user_uuid))
-                        & (sessions.c.access_token == access_token_hash)
-                        & (sessions.c.revoked.is_(False))
-                        & (users.c.status.is_(True))
-                    )
-                )
-                result = session.execute(base_query).fetchone()
+            # Buscar sessão no banco (réplica de leitura quando possível)
+            with get_session(replica=use_replica, shard_key=UUID(user_uuid)) as session:
+                result = session.execute(
+                    statements.select_session_user,
+                    {
+                        "user_uuid": UUID(user_uuid),
+                        "access_token_hash": access_token_hash,
+                    },
+                ).fetchone()
 
                 if not result:
                     self.message = "User not found or session invalid"
                     return False
 
-            # Armazena o usuário atual no contexto como entidade User
-            info.context.user = User(
-                uuid=result.uuid,
-                name=result.name,
-                email=result.email,
-                role=result.role,
-                fingerprint=result.fingerprint,
-                avatar=result.avatar,
-                date=result.date,
-                status=result.status,
-            )
+            # last_seen_at e contagem de requisições gravados em lote
+            write_behind.touch_session(result.session_uuid, result.uuid)
+
+            # Usuário atual no contexto, montado direto da linha
+            context.user = Principal.from_row(result)
             return True
 
         except Exception as e:
-            print(f"Authentication error: {e}")
+            logger.error("authentication_failed", error=str(e))
             self.message = f"Authentication error: {str(e)}"
             return False
+
+
+@dataclass
+class IsAdmin(IsAuthenticated):
+    """Usuário autenticado com role admin"""
+
+    message: str = "User is not authenticated"
+    error_extensions: dict = field(default_factory=lambda: {"code": "FORBIDDEN"})
+
+    def has_permission(self, source: object, info: Info, **kwargs) -> bool:
+        if not super().has_permission(source, info, **kwargs):
+            self.error_extensions = {"code": "UNAUTHORIZED"}
+            return False
+
+        if info.context.user.role != "admin":
+            self.message = "Admin role required"
+            self.error_extensions = {"code": "FORBIDDEN"}
+            return False
+        return True
+
+
+def authenticate_connection(context) -> None:
+    """Autentica uma conexão websocket uma única vez, no connection_init
+
+    Sem cookie a conexão segue anônima (operações com IsAuthenticated são
+    negadas). Cookie inválido ou expirado levanta ValueError: websockets não
+    podem renovar o access token, o cliente deve renová-lo via HTTP antes.
+    """
+    settings = context.settings
+    access_token = context.request.cookies.get("x-access-token")
+
+    if not access_token:
+        context.authenticated = False
+        context.auth_message = "Authentication cookie missing or invalid"
+        return
+
+    token_service = TokenService(
+        settings.jwt_secret_key,
+        settings.salt,
+        settings.access_token_expires_minutes,
+        settings.refresh_token_expires_days,
+        settings.fast_token_codec,
+    )
+
+    payload = token_service.decode_token(access_token)
+    if not payload or payload.get("type") != "access":
+        raise ValueError("Invalid or expired access token")
+
+    if token_epochs.is_revoked(payload):
+        raise ValueError("Token revoked")
+
+    # Conexão logo após o login lê do primário (read-your-writes), como no HTTP
+    use_replica = not token_service.is_recently_issued(
+        payload, settings.read_your_writes_seconds
+    )
+
+    user_uuid = UUID(payload["uuid"])
+    with get_session(replica=use_replica, shard_key=user_uuid) as session:
+        result = session.execute(
+            statements.select_session_user,
+            {
+                "user_uuid": user_uuid,
+                "access_token_hash": token_service.hash_token(payload["access_token"]),
+            },
+        ).fetchone()
+
+    if not result:
+        raise ValueError("User not found or session invalid")
+
+    # Resultado válido por toda a conexão (IsAuthenticated reutiliza)
+    context.authenticated = True
+    context.session_uuid = result.session_uuid
+    context.user = Principal.from_row(result)
+
+
+def is_session_active(session_uuid: UUID, user_uuid: UUID) -> bool:
+    """Verifica se a sessão segue válida (não revogada, dentro do refresh e
+    posterior aos epochs global e do usuário)"""
+    with get_session(replica=True, shard_key=user_uuid) as session:
+        return (
+            session.execute(
+                statements.select_active_session,
+                {
+                    "session_uuid": session_uuid,
+                    "now": datetime.now(timezone.utc),
+                    "global_epoch": token_epochs.valid_after or EPOCH_ZERO,
+                },
+            ).first()
+            is not None
+        )
@@ -11,5 +11,5 @@ class AccessTokenResult:
     """Resultado da criação de um novo access token"""
 
     access_token_jwt: str
-    access_token_hash: str
+    access_token_hash: bytes
     access_expires_at: datetime
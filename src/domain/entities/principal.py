@@ -0,0 +1,26 @@
+from uuid import UUID
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class Principal(NamedTuple):
+    """Usuário autenticado da requisição (read-model imutável)
+
+    Tupla nomeada (__slots__ vazio, sem __dict__) montada direto da linha de
+    select_session_user, na mesma ordem das colunas: sem default factories
+    nem cópias campo a campo por requisição.
+    """
+
+    uuid: UUID
+    name: str
+    email: str
+    role: str
+    fingerprint: int
+    status: bool
+    avatar: Optional[str]
+    date: datetime
+    session_uuid: UUID
+
+    @classmethod
+    def from_row(cls, row) -> "Principal":
+        return tuple.__new__(cls, row)
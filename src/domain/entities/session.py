@@ -8,8 +8,8 @@ from typing import Optional
 class Session:
     """Entidade de domínio para Session"""
 
-    access_token: str
-    refresh_token: str
+    access_token: bytes
+    refresh_token: bytes
     user_uuid: UUID
     access_token_expires_at: datetime
     refresh_token_expires_at: datetime
@@ -14,5 +14,5 @@ class TokenPair:
     refresh_token: str
     access_token_expires_at: datetime
     refresh_token_expires_at: datetime
-    access_token_hash: str
-    refresh_token_hash: str
+    access_token_hash: bytes
+    refresh_token_hash: bytes
@@ -5,6 +5,11 @@ from datetime import datetime, timezone
 from typing import Optional
 
 
+def normalize_email(email: str) -> str:
+    """Forma canônica do e-mail usada em buscas e unicidade (sem caixa)"""
+    return email.strip().lower()
+
+
 @dataclass
 class User:
     """Entidade de domínio para User"""
@@ -0,0 +1,16 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class AvatarRepository(ABC):
+    """Interface para o armazenamento de avatares endereçado por conteúdo"""
+
+    @abstractmethod
+    def save(self, data: bytes) -> str:
+        """Armazena a imagem e retorna o hash do conteúdo"""
+        pass
+
+    @abstractmethod
+    def path(self, avatar_hash: str, thumbnail: bool = False) -> Optional[str]:
+        """Retorna o caminho do arquivo armazenado ou None se não existir"""
+        pass
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from src.domain.entities.user import User
 from typing import Dict, Any
+from uuid import UUID
+from datetime import datetime
 
 
 class UserRepository(ABC):
@@ -22,3 +24,21 @@ class UserRepository(ABC):
     def revoke_session(self, refresh_token: str) -> bool:
         """Revoga uma sessão específica usando o refresh token"""
         pass
+
+    @abstractmethod
+    def update_avatar(self, user_uuid: UUID, avatar_hash: str) -> bool:
+        """Atualiza o hash do avatar do usuário"""
+        pass
+
+    @abstractmethod
+    def revoke_user_tokens(self, user_uuid: UUID, valid_after: datetime) -> bool:
+        """Invalida as sessões do usuário criadas até valid_after"""
+        pass
+
+    @abstractmethod
+    def revoke_all_tokens(self, valid_after: datetime) -> datetime:
+        """Invalida as sessões de todos os usuários criadas até valid_after
+
+        O epoch global só avança; retorna o epoch em vigor.
+        """
+        pass
@@ -0,0 +1,24 @@
+"""
+Tipo de imagem pelos primeiros bytes (assinaturas dos formatos aceitos)
+"""
+
+from typing import Optional
+
+# Assinaturas dos formatos de imagem aceitos
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+}
+
+
+def detect_media_type(header: bytes) -> Optional[str]:
+    """Identifica o tipo da imagem pelos primeiros bytes"""
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+
+    for signature, media_type in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return media_type
+    return None
@@ -0,0 +1,86 @@
+"""
+Hash e verificação de senhas (bcrypt) com custo uniforme no login
+
+E-mails desconhecidos (ou de usuários inativos) são verificados contra um
+hash fictício de mesmo custo, pré-calculado na inicialização: todo login
+executa exatamente um bcrypt, e o tempo de resposta não revela se a conta
+existe. O bcrypt roda num executor próprio, limitado ao número de CPUs, fora
+do event loop e do threadpool padrão.
+
+Uso (custo de CPU de cada caminho do login):
+    python -m src.domain.services.password_service [repetições]
+"""
+
+import sys
+import time
+import asyncio
+import secrets
+import contextvars
+import bcrypt
+from functools import partial
+from typing import Callable, Optional, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from src.infrastructure.config.settings import get_hashing_workers
+
+# Custo dos hashes novos (o hash fictício precisa do mesmo custo)
+BCRYPT_ROUNDS = 10
+
+# Senha aleatória: o hash fictício nunca corresponde a uma senha digitada
+DUMMY_HASH = bcrypt.hashpw(secrets.token_bytes(16), bcrypt.gensalt(BCRYPT_ROUNDS))
+
+hashing_executor = ThreadPoolExecutor(
+    max_workers=get_hashing_workers(), thread_name_prefix="hashing"
+)
+
+T = TypeVar("T")
+
+
+def hash_password(password: str) -> str:
+    """Gera o hash bcrypt da senha"""
+    return bcrypt.hashpw(
+        password.encode("utf-8"), bcrypt.gensalt(BCRYPT_ROUNDS)
+    ).decode("utf-8")
+
+
+def verify_password(password: str, password_hash: Optional[str]) -> bool:
+    """Verifica a senha; sem hash (usuário inexistente) paga o mesmo custo"""
+    if password_hash is None:
+        bcrypt.checkpw(password.encode("utf-8"), DUMMY_HASH)
+        return False
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+
+async def run_hashing(function: Callable[..., T], *args, **kwargs) -> T:
+    """Executa no executor de hash com o contexto da requisição
+
+    O contexto copiado leva a unidade de trabalho e o contexto dos logs.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        hashing_executor, partial(context.run, function, *args, **kwargs)
+    )
+
+
+def benchmark(repetitions: int = 20) -> None:
+    """Tempo de CPU por verificação em cada caminho do login"""
+    password_hash = hash_password("correta")
+    paths = {
+        "e-mail desconhecido": lambda: verify_password("errada", None),
+        "senha errada": lambda: verify_password("errada", password_hash),
+        "senha correta": lambda: verify_password("correta", password_hash),
+    }
+
+    for name, verify in paths.items():
+        started_at = time.process_time()
+        for _ in range(repetitions):
+            verify()
+        cpu_ms = (time.process_time() - started_at) / repetitions * 1000
+        print(f"{name}: {cpu_ms:.1f} ms de CPU por login")
+
+    print(
+        f"Limite de CPU: {get_hashing_workers()} bcrypt em paralelo (HASHING_WORKERS)"
+    )
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,134 @@
+"""
+Codec JWT HS256 especializado para o layout fixo de claims dos tokens
+
+Compatível byte a byte com o PyJWT para os tokens emitidos pelo TokenService.
+A chave HMAC é preparada uma única vez e o header é pré-codificado. Tokens
+fora do layout conhecido (outro header, claims extras, tipos inesperados)
+não são tratados aqui: decode retorna None e o chamador usa o PyJWT.
+"""
+
+import hmac
+import json
+import time
+import base64
+import binascii
+import hashlib
+from calendar import timegm
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from jwt.exceptions import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidSignatureError,
+)
+
+# Mesmo header que o PyJWT gera (chaves ordenadas, sem espaços)
+HEADER = b'{"alg":"HS256","typ":"JWT"}'
+
+# Claims emitidos pelo TokenService
+CLAIMS = frozenset(
+    {"uuid", "access_token", "refresh_token", "type", "exp", "iat", "auth_time"}
+)
+
+
+def base64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def base64url_decode(data: bytes) -> bytes:
+    remainder = len(data) % 4
+    if remainder:
+        data += b"=" * (4 - remainder)
+    return base64.urlsafe_b64decode(data)
+
+
+class HS256TokenCodec:
+    """Codifica e valida JWTs HS256 com chave e header pré-computados"""
+
+    __slots__ = ("_mac", "_header_segment")
+
+    def __init__(self, key: str):
+        self._mac = hmac.new(key.encode("utf-8"), digestmod=hashlib.sha256)
+        self._header_segment = base64url_encode(HEADER)
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        # Copiar o estado do HMAC evita refazer o processamento da chave
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        """Gera o token, idêntico ao jwt.encode(payload, key, "HS256")"""
+        claims = payload.copy()
+        for time_claim in ("exp", "iat"):
+            if isinstance(claims.get(time_claim), datetime):
+                claims[time_claim] = timegm(claims[time_claim].utctimetuple())
+
+        payload_segment = base64url_encode(
+            json.dumps(claims, separators=(",", ":")).encode("utf-8")
+        )
+        signing_input = self._header_segment + b"." + payload_segment
+        signature = base64url_encode(self._sign(signing_input))
+        return (signing_input + b"." + signature).decode("utf-8")
+
+    def decode(self, token: str, verify_exp: bool = True) -> Optional[Dict[str, Any]]:
+        """Valida o token e retorna o payload
+
+        Lança as mesmas exceções do PyJWT para tokens inválidos e retorna
+        None quando o token não segue o layout fixo.
+        """
+        if not isinstance(token, str):
+            return None
+
+        try:
+            signing_input, crypto_segment = token.encode("utf-8").rsplit(b".", 1)
+            header_segment, payload_segment = signing_input.split(b".", 1)
+        except ValueError as e:
+            raise DecodeError("Not enough segments") from e
+
+        if header_segment != self._header_segment:
+            return None
+
+        try:
+            payload_data = base64url_decode(payload_segment)
+            signature = base64url_decode(crypto_segment)
+        except (TypeError, binascii.Error) as e:
+            raise DecodeError("Invalid crypto padding") from e
+
+        # Comparação em tempo constante
+        if not hmac.compare_digest(signature, self._sign(signing_input)):
+            raise InvalidSignatureError("Signature verification failed")
+
+        try:
+            payload = json.loads(payload_data)
+        except ValueError as e:
+            raise DecodeError(f"Invalid payload string: {e}") from e
+
+        if not isinstance(payload, dict):
+            raise DecodeError("Invalid payload string: must be a json object")
+
+        if not payload.keys() <= CLAIMS:
+            return None
+
+        # Claims de tempo com tipos inesperados ficam com o PyJWT
+        for time_claim in ("exp", "iat"):
+            if time_claim in payload and type(payload[time_claim]) is not int:
+                return None
+
+        now = time.time()
+
+        if "iat" in payload and payload["iat"] > now:
+            raise ImmatureSignatureError("The token is not yet valid (iat)")
+
+        if verify_exp and "exp" in payload and payload["exp"] <= now:
+            raise ExpiredSignatureError("Signature has expired")
+
+        return payload
+
+
+@lru_cache(maxsize=8)
+def hs256_codec(key: str) -> HS256TokenCodec:
+    """Codec compartilhado por chave (a preparação da chave acontece uma vez)"""
+    return HS256TokenCodec(key)
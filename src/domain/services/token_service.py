@@ -5,16 +5,23 @@ Serviço para gerenciamento de tokens JWT e refresh tokens
 import jwt
 import hashlib
 import secrets
+import structlog
 from uuid import UUID
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
-from sqlalchemy import update
 
-from src.infrastructure.database.session import get_session
-from src.infrastructure.database.models import sessions
+from functools import partial
+from src.infrastructure.database.session import get_session, on_commit
+from src.infrastructure.database import statements
+from src.infrastructure.database.write_behind import write_behind
+from src.infrastructure.database.token_epochs import token_epochs
+from src.infrastructure.events.revocations import revocation_notifier
 from src.domain.entities.token_pair import TokenPair
 from src.domain.entities.access_token_result import AccessTokenResult
+from src.domain.services.token_codec import hs256_codec
+
+logger = structlog.get_logger(__name__)
 
 
 @dataclass
@@ -25,9 +32,24 @@ class TokenService:
     salt: str
     access_token_expires_minutes: int
     refresh_token_expires_days: int
+    fast_codec: bool = False
+
+    def encode_token(self, payload: Dict[str, Any]) -> str:
+        """Codifica um token JWT HS256"""
+        if self.fast_codec:
+            return hs256_codec(self.jwt_key).encode(payload)
+        return jwt.encode(payload, key=self.jwt_key, algorithm="HS256")
 
-    def generate_token_pair(self, user_uuid: str) -> TokenPair:
-        """Gera um novo par de tokens para o usuário"""
+    def generate_token_pair(
+        self, user_uuid: str, auth_time: Optional[float] = None
+    ) -> TokenPair:
+        """Gera um novo par de tokens para o usuário
+
+        `auth_time` é o instante do login (agora, por padrão); a renovação
+        repassa o do refresh token para que o epoch continue valendo.
+        """
+        if auth_time is None:
+            auth_time = datetime.now(timezone.utc).timestamp()
 
         # Gerar valores aleatórios
         access_token_random = secrets.token_hex()
@@ -38,34 +60,33 @@ class TokenService:
         refresh_token_hash = self.hash_token(refresh_token_random)
 
         # Definir tempos de expiração usando UTC com valores configuráveis
-        access_expires_at = datetime.now(timezone.utc) + timedelta(
+        issued_at = datetime.now(timezone.utc)
+        access_expires_at = issued_at + timedelta(
             minutes=self.access_token_expires_minutes
         )
-        refresh_expires_at = datetime.now(timezone.utc) + timedelta(
-            days=self.refresh_token_expires_days
-        )
+        refresh_expires_at = issued_at + timedelta(days=self.refresh_token_expires_days)
 
         # Gerar JWTs
-        access_jwt = jwt.encode(
+        access_jwt = self.encode_token(
             {
                 "uuid": user_uuid,
                 "access_token": access_token_random,
                 "type": "access",
                 "exp": access_expires_at,
-            },
-            key=self.jwt_key,
-            algorithm="HS256",
+                "iat": issued_at,
+                "auth_time": auth_time,
+            }
         )
 
-        refresh_jwt = jwt.encode(
+        refresh_jwt = self.encode_token(
             {
                 "uuid": user_uuid,
                 "refresh_token": refresh_token_random,
                 "type": "refresh",
                 "exp": refresh_expires_at,
-            },
-            key=self.jwt_key,
-            algorithm="HS256",
+                "iat": issued_at,
+                "auth_time": auth_time,
+            }
         )
 
         return TokenPair(
@@ -94,20 +115,29 @@ class TokenService:
             if not user_uuid or not refresh_token_value:
                 return None
 
+            # Sessão revogada pelo epoch global não renova
+            if token_epochs.is_revoked(refresh_payload):
+                return None
+
             # Gerar hash do refresh token para consulta
             refresh_token_hash = self.hash_token(refresh_token_value)
 
             # Verificar se o refresh token não expirou, revoga a sessão
             if not self.is_token_valid(refresh_payload):
-                with get_session() as session:
-                    session.execute(
-                        update(sessions)
-                        .where(
-                            (sessions.c.user_uuid == UUID(user_uuid))
-                            & (sessions.c.refresh_token == refresh_token_hash)
+                write_behind.audit("refresh_expired", user_uuid=UUID(user_uuid))
+                with get_session(shard_key=UUID(user_uuid)) as session:
+                    revoked = (
+                        session.execute(
+                            statements.revoke_user_session_by_refresh_token,
+                            {
+                                "session_user_uuid": UUID(user_uuid),
+                                "refresh_token_hash": refresh_token_hash,
+                            },
                         )
-                        .values(revoked=True)
+                        .scalars()
+                        .all()
                     )
+                    on_commit(session, partial(revocation_notifier.publish, revoked))
                 return None
 
             # Decodificar o access token atual para obter o valor interno
@@ -120,32 +150,34 @@ class TokenService:
             if current_access_token_value:
                 current_access_token_hash = self.hash_token(current_access_token_value)
 
-            # Gerar novo par de tokens e usar apenas o access token
-            token_pair = self.generate_token_pair(user_uuid)
+            # Gerar novo par de tokens e usar apenas o access token (tokens
+            # sem auth_time seguem como 0: revogados por qualquer epoch)
+            token_pair = self.generate_token_pair(
+                user_uuid, refresh_payload.get("auth_time", 0)
+            )
 
             # Atualizar apenas o access token na sessão
-            with get_session() as session:
-                # Construir a condição WHERE base
-                where_condition = (
-                    (sessions.c.user_uuid == UUID(user_uuid))
-                    & (sessions.c.refresh_token == refresh_token_hash)
-                    & (sessions.c.access_token == current_access_token_hash)
-                    & (sessions.c.revoked.is_(False))
-                )
-
+            with get_session(shard_key=UUID(user_uuid)) as session:
                 result = session.execute(
-                    update(sessions)
-                    .where(where_condition)
-                    .values(
-                        access_token=token_pair.access_token_hash,
-                        access_token_expires_at=token_pair.access_token_expires_at,
-                    )
+                    statements.rotate_access_token,
+                    {
+                        "session_user_uuid": UUID(user_uuid),
+                        "refresh_token_hash": refresh_token_hash,
+                        "current_access_token_hash": current_access_token_hash,
+                        "new_access_token_hash": token_pair.access_token_hash,
+                        "new_access_token_expires_at": (
+                            token_pair.access_token_expires_at
+                        ),
+                    },
                 )
 
                 # Verificar se a atualização foi bem-sucedida
                 if result.rowcount == 0:
+                    write_behind.audit("refresh_failed", user_uuid=UUID(user_uuid))
                     return None
 
+                write_behind.audit("refresh", user_uuid=UUID(user_uuid))
+
                 # Retornar apenas os dados do access token
                 return AccessTokenResult(
                     access_token_jwt=token_pair.access_token,
@@ -154,7 +186,7 @@ class TokenService:
                 )
 
         except Exception as e:
-            print(f"Refresh token error: {e}")
+            logger.error("token_refresh_failed", error=str(e))
             return None
 
     def decode_token(
@@ -162,20 +194,24 @@ class TokenService:
     ) -> Optional[Dict[str, Any]]:
         """Decodifica um token JWT"""
         try:
+            # Codec especializado; tokens fora do layout fixo seguem pelo PyJWT
+            if self.fast_codec:
+                payload = hs256_codec(self.jwt_key).decode(token, verify_exp)
+                if payload is not None:
+                    return payload
+
             # Se verify_exp False permite decodificar tokens expirados
             options = {"verify_exp": verify_exp} if not verify_exp else {}
             return jwt.decode(
                 token, self.jwt_key, algorithms=["HS256"], options=options
             )
         except jwt.PyJWTError as e:
-            print(f"Token decode error: {e}")
+            logger.warning("token_decode_failed", error=str(e))
             return None
 
-    def hash_token(self, token: str) -> str:
-        """Gera hash de um token para armazenamento seguro"""
-        return hashlib.pbkdf2_hmac(
-            "sha256", token.encode(), self.salt.encode(), 1000
-        ).hex()
+    def hash_token(self, token: str) -> bytes:
+        """Gera hash de um token para armazenamento seguro (32 bytes)"""
+        return hashlib.pbkdf2_hmac("sha256", token.encode(), self.salt.encode(), 1000)
 
     def is_token_valid(self, payload: Dict[str, Any]) -> bool:
         """Verifica se o token não expirou com margem de 60 segundos"""
@@ -186,3 +222,16 @@ class TokenService:
             # Considera o token expirado 60 segundos antes da expiração real
             return now < (token_exp_datetime - timedelta(seconds=60))
         return False
+
+    def is_recently_issued(self, payload: Dict[str, Any], seconds: int) -> bool:
+        """Verifica se o access token foi emitido há menos de `seconds` segundos"""
+        if payload.get("iat"):
+            issued_at = datetime.fromtimestamp(payload["iat"], timezone.utc)
+        elif payload.get("exp"):
+            # Tokens anteriores ao iat: estimado pela duração configurada
+            issued_at = datetime.fromtimestamp(
+                payload["exp"], timezone.utc
+            ) - timedelta(minutes=self.access_token_expires_minutes)
+        else:
+            return True
+        return datetime.now(timezone.utc) - issued_at < timedelta(seconds=seconds)
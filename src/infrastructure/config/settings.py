@@ -1,6 +1,7 @@
 import os
 import dotenv
 from dataclasses import dataclass
+from typing import Any, Dict, Optional
 
 dotenv.load_dotenv()
 
@@ -19,17 +20,122 @@ class Settings:
     port: int = 8000
     reload: bool = True
     production: bool = False
+    read_your_writes_seconds: int = 5
+    session_policy: str = "single"
+    max_sessions: int = 5
+    avatar_storage_path: str = "./storage/avatars"
+    avatar_max_bytes: int = 2 * 1024 * 1024
+    admission_expensive_limit: int = 8
+    admission_cheap_limit: int = 64
+    admission_target_ms: int = 100
+    admission_interval_ms: int = 1000
+    admission_max_wait_ms: int = 2000
+    login_min_response_ms: int = 250
+    write_behind_flush_interval_ms: int = 1000
+    write_behind_flush_size: int = 500
+    write_behind_max_pending: int = 10000
+    fast_token_codec: bool = False
+    graphql_max_batch_size: int = 10
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    profiling_output_dir: str = "./profiles"
+    profiling_format: str = "speedscope"
+    profiling_max_seconds: int = 30
+    ws_revalidate_seconds: int = 60
+    log_level: str = "INFO"
+    log_format: str = "json"
+    log_queue_size: int = 10000
+    log_rate_limit: int = 10
+    log_rate_limit_interval_seconds: float = 10.0
 
     def __post_init__(self):
         if self.cors_origins is None:
             self.cors_origins = ["*"]
 
+        if self.session_policy not in ("single", "limited", "unlimited"):
+            raise ValueError(f"SESSION_POLICY inválida: {self.session_policy}")
+
+        if self.max_sessions < 1:
+            raise ValueError("MAX_SESSIONS deve ser maior que zero")
+
+        if self.graphql_max_batch_size < 0:
+            raise ValueError("GRAPHQL_MAX_BATCH_SIZE não pode ser negativo")
+
+        if not 0 <= self.profiling_sample_rate <= 1:
+            raise ValueError("PROFILING_SAMPLE_RATE deve estar entre 0 e 1")
+
+        if self.log_format not in ("json", "console"):
+            raise ValueError(f"LOG_FORMAT inválido: {self.log_format}")
+
 
 def get_database_url() -> str:
     """Obtém a URL do banco de dados"""
     return os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
 
+def get_database_read_url() -> str:
+    """Obtém a URL da réplica de leitura (usa o primário se não definida)"""
+    return os.getenv("DATABASE_READ_URL") or get_database_url()
+
+
+def get_database_prepare_threshold() -> Optional[int]:
+    """Obtém após quantas execuções o psycopg prepara o statement no servidor
+
+    Retorna None para desativar (ex.: PgBouncer em modo transaction).
+    """
+    value = os.getenv("DATABASE_PREPARE_THRESHOLD", "1")
+    return None if value.lower() == "none" else int(value)
+
+
+def get_shard_urls() -> Dict[str, str]:
+    """Obtém o mapa de shards (nome=url separados por vírgula)
+
+    Vazio desativa o sharding: usuários e sessões ficam em DATABASE_URL.
+    """
+    shards = {}
+    for item in filter(None, os.getenv("SHARDS", "").split(",")):
+        name, url = item.split("=", 1)
+        shards[name.strip()] = url.strip()
+    return shards
+
+
+def get_shard_map_ttl() -> float:
+    """Obtém por quantos segundos o mapa de buckets fica em cache"""
+    return float(os.getenv("SHARD_MAP_TTL_SECONDS", "5"))
+
+
+def get_token_epoch_ttl() -> float:
+    """Obtém por quantos segundos o epoch global dos tokens fica em cache"""
+    return float(os.getenv("TOKEN_EPOCH_CACHE_SECONDS", "5"))
+
+
+def get_export_watermark_lag() -> float:
+    """Obtém a margem, em segundos, entre agora e o fim de cada exportação"""
+    return float(os.getenv("EXPORT_WATERMARK_LAG_SECONDS", "30"))
+
+
+def get_sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMAs aplicados a cada conexão SQLite"""
+    return {
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        # Valor negativo: tamanho do cache em KiB por conexão
+        "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "temp_store": "MEMORY",
+    }
+
+
+def get_hashing_workers() -> int:
+    """Obtém o número de threads do executor de hash de senhas (bcrypt)"""
+    return int(os.getenv("HASHING_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def get_sqlite_read_pool_size() -> int:
+    """Obtém o número de conexões de leitura do SQLite"""
+    return int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+
+
 def get_settings() -> Settings:
     """Obtém as configurações da aplicação"""
     return Settings(
@@ -43,4 +149,35 @@ def get_settings() -> Settings:
         port=int(os.getenv("PORT")),
         reload=os.getenv("RELOAD").lower() == "true",
         production=os.getenv("PRODUCTION").lower() == "true",
+        read_your_writes_seconds=int(os.getenv("READ_YOUR_WRITES_SECONDS", "5")),
+        session_policy=os.getenv("SESSION_POLICY", "single").lower(),
+        max_sessions=int(os.getenv("MAX_SESSIONS", "5")),
+        avatar_storage_path=os.getenv("AVATAR_STORAGE_PATH", "./storage/avatars"),
+        avatar_max_bytes=int(os.getenv("AVATAR_MAX_BYTES", str(2 * 1024 * 1024))),
+        admission_expensive_limit=int(os.getenv("ADMISSION_EXPENSIVE_LIMIT", "8")),
+        admission_cheap_limit=int(os.getenv("ADMISSION_CHEAP_LIMIT", "64")),
+        admission_target_ms=int(os.getenv("ADMISSION_TARGET_MS", "100")),
+        admission_interval_ms=int(os.getenv("ADMISSION_INTERVAL_MS", "1000")),
+        admission_max_wait_ms=int(os.getenv("ADMISSION_MAX_WAIT_MS", "2000")),
+        login_min_response_ms=int(os.getenv("LOGIN_MIN_RESPONSE_MS", "250")),
+        write_behind_flush_interval_ms=int(
+            os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "1000")
+        ),
+        write_behind_flush_size=int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "500")),
+        write_behind_max_pending=int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000")),
+        fast_token_codec=os.getenv("FAST_TOKEN_CODEC", "false").lower() == "true",
+        graphql_max_batch_size=int(os.getenv("GRAPHQL_MAX_BATCH_SIZE", "10")),
+        profiling_enabled=os.getenv("PROFILING_ENABLED", "false").lower() == "true",
+        profiling_sample_rate=float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+        profiling_output_dir=os.getenv("PROFILING_OUTPUT_DIR", "./profiles"),
+        profiling_format=os.getenv("PROFILING_FORMAT", "speedscope").lower(),
+        profiling_max_seconds=int(os.getenv("PROFILING_MAX_SECONDS", "30")),
+        ws_revalidate_seconds=int(os.getenv("WS_REVALIDATE_SECONDS", "60")),
+        log_level=os.getenv("LOG_LEVEL", "INFO").upper(),
+        log_format=os.getenv("LOG_FORMAT", "json").lower(),
+        log_queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        log_rate_limit=int(os.getenv("LOG_RATE_LIMIT", "10")),
+        log_rate_limit_interval_seconds=float(
+            os.getenv("LOG_RATE_LIMIT_INTERVAL_SECONDS", "10")
+        ),
     )
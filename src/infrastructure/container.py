@@ -11,6 +11,7 @@ from src.domain.services.token_service import TokenService
 from src.infrastructure.database.repositories.user_repository import (
     SQLAlchemyUserRepository,
 )
+from src.infrastructure.storage.avatar_repository import LocalAvatarRepository
 
 
 class Container(containers.DeclarativeContainer):
@@ -26,16 +27,28 @@ class Container(containers.DeclarativeContainer):
         salt=settings().salt,
         access_token_expires_minutes=settings().access_token_expires_minutes,
         refresh_token_expires_days=settings().refresh_token_expires_days,
+        fast_codec=settings().fast_token_codec,
     )
 
     # Repositórios
     user_repository = providers.Singleton(
         SQLAlchemyUserRepository,
         token_service=token_service,
+        session_policy=settings().session_policy,
+        max_sessions=settings().max_sessions,
+    )
+
+    avatar_repository = providers.Singleton(
+        LocalAvatarRepository, root=settings().avatar_storage_path
     )
 
     # Use Cases
-    user_use_cases = providers.Factory(UserUseCases, user_repository=user_repository)
+    user_use_cases = providers.Factory(
+        UserUseCases,
+        user_repository=user_repository,
+        avatar_repository=avatar_repository,
+        avatar_max_bytes=settings().avatar_max_bytes,
+    )
 
     # Resolvers
     user_resolvers = providers.Factory(UserResolvers, user_use_cases=user_use_cases)
@@ -0,0 +1,188 @@
+"""
+Exportação de usuários e sessões em streaming (NDJSON ou CSV)
+
+As linhas são lidas com cursor no servidor (yield_per) e escritas em blocos,
+com memória constante independente do tamanho da tabela. Senhas e hashes
+de tokens nunca são exportados.
+
+Uso:
+    python -m src.infrastructure.database.export <users|sessions>
+        [--format ndjson|csv] [--since DATA] [--until DATA] [--gzip]
+        [--output ARQUIVO]
+
+A exportação cobre o intervalo (since, until] de `date`; o fim do intervalo
+é impresso no stderr e serve de `--since` na próxima. Por padrão o fim fica
+EXPORT_WATERMARK_LAG_SECONDS no passado: `date` é definido antes do commit
+(e a réplica chega depois), e uma linha ainda não visível com `date` antes
+do fim ficaria de fora desta exportação e da próxima.
+"""
+
+import io
+import csv
+import sys
+import json
+import zlib
+import argparse
+from uuid import UUID
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterator, List, Optional
+from sqlalchemy import select
+from src.infrastructure.config.settings import get_export_watermark_lag
+from src.infrastructure.database.models import users, sessions
+from src.infrastructure.database.session import (
+    read_engine,
+    shard_read_engines,
+    shard_router,
+)
+
+# Linhas por lote do cursor e tamanho dos blocos escritos
+BATCH_SIZE = 10000
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("ndjson", "csv")
+
+# Colunas exportadas (sem senha e sem hashes de tokens)
+EXPORTS = {
+    "users": [column for column in users.c if column.name != "password"],
+    "sessions": [
+        column
+        for column in sessions.c
+        if column.name not in ("access_token", "refresh_token")
+    ],
+}
+
+
+def _converters(columns) -> List[Optional[Callable[[Any], Any]]]:
+    """Conversão para texto por coluna (None = valor já serializável)"""
+    converters = []
+    for column in columns:
+        python_type = column.type.python_type
+        if python_type is datetime:
+            converters.append(datetime.isoformat)
+        elif python_type is UUID:
+            converters.append(str)
+        else:
+            converters.append(None)
+    return converters
+
+
+def _values(converters, row: tuple) -> list:
+    return [
+        value if convert is None or value is None else convert(value)
+        for convert, value in zip(converters, row)
+    ]
+
+
+def watermark() -> datetime:
+    """Fim padrão do intervalo: agora menos a margem de segurança"""
+    return datetime.now(timezone.utc) - timedelta(seconds=get_export_watermark_lag())
+
+
+def export_rows(
+    table: str, since: Optional[datetime], until: datetime
+) -> Iterator[tuple]:
+    """Linhas da tabela com since < date <= until, de todos os shards"""
+    columns = EXPORTS[table]
+    date = columns[0].table.c.date
+
+    query = select(*columns).where(date <= until)
+    if since is not None:
+        query = query.where(date > since)
+
+    # Réplica de leitura (ou leitores dos shards): nada de leitura longa no primário
+    engines = shard_read_engines.values() if shard_router.enabled else [read_engine]
+    for database_engine in engines:
+        with database_engine.connect() as conn:
+            result = conn.execution_options(yield_per=BATCH_SIZE).execute(query)
+            for partition in result.partitions():
+                yield from partition
+
+
+def _ndjson(columns, rows: Iterator[tuple]) -> Iterator[str]:
+    names = [column.name for column in columns]
+    converters = _converters(columns)
+    encode = json.JSONEncoder(ensure_ascii=False).encode
+    for row in rows:
+        yield encode(dict(zip(names, _values(converters, row)))) + "\n"
+
+
+def _csv(columns, rows: Iterator[tuple]) -> Iterator[str]:
+    converters = _converters(columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column.name for column in columns)
+    for row in rows:
+        writer.writerow(_values(converters, row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_export(
+    table: str,
+    format: str = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """Gera a exportação em blocos de bytes (gzip opcional)"""
+    if table not in EXPORTS:
+        raise ValueError(f"Tabela não exportável: {table}")
+    if format not in FORMATS:
+        raise ValueError(f"Formato inválido: {format}")
+
+    columns = EXPORTS[table]
+    rows = export_rows(table, since, until or watermark())
+    lines = _ndjson(columns, rows) if format == "ndjson" else _csv(columns, rows)
+
+    # wbits=31: formato gzip (não zlib puro)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    pending, size = [], 0
+    for line in lines:
+        pending.append(line)
+        size += len(line)
+        if size < CHUNK_SIZE:
+            continue
+
+        chunk = "".join(pending).encode()
+        pending, size = [], 0
+        if compressor:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+
+    chunk = "".join(pending).encode()
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def parse_date(value: str) -> datetime:
+    """Data ISO 8601; sem fuso, assume UTC"""
+    date = datetime.fromisoformat(value)
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="export")
+    parser.add_argument("table", choices=sorted(EXPORTS))
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--since", type=parse_date)
+    parser.add_argument("--until", type=parse_date)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    until = args.until or watermark()
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    with output:
+        for chunk in stream_export(
+            args.table, args.format, args.since, until, args.gzip
+        ):
+            output.write(chunk)
+
+    # Marca d'água para a próxima exportação incremental
+    print(f"--since {until.isoformat()}", file=sys.stderr)
@@ -0,0 +1,563 @@
+"""
+Migrações de dados do banco
+
+Uso: python -m src.infrastructure.database.migrations <migração> [fase]
+"""
+
+import sys
+import base64
+import binascii
+from sqlalchemy import inspect, text, select, update, func, bindparam, LargeBinary
+from src.infrastructure.config.settings import get_settings
+from src.infrastructure.database.session import engine, shard_engines
+from src.infrastructure.database.models import metadata, users
+from src.infrastructure.database.sharding import bucket_for
+from src.domain.entities.user import normalize_email
+from src.domain.services.media_type import detect_media_type
+from src.infrastructure.storage.avatar_repository import LocalAvatarRepository
+
+BATCH_SIZE = 5000
+
+
+def _column_is_binary(table: str, column: str) -> bool:
+    """Verifica se a coluna já está armazenada como binário"""
+    columns = {c["name"]: c["type"] for c in inspect(engine).get_columns(table)}
+    return isinstance(columns.get(column), LargeBinary)
+
+
+def session_hashes_to_binary(phase: str = "prepare") -> None:
+    """Converte sessions.access_token/refresh_token de hex (Text) para 32 bytes
+
+    No PostgreSQL a migração é dividida em duas fases:
+
+    - prepare: cria colunas binárias, um trigger que as mantém sincronizadas,
+      preenche em lotes e cria os índices únicos com CONCURRENTLY. Pode rodar
+      com a versão antiga da aplicação no ar (e ser repetida).
+    - swap: troca as colunas numa transação curta. Exige parar todas as
+      instâncias da versão antiga antes (elas gravam e buscam hashes em hex,
+      que deixam de existir) e subir a versão nova depois.
+
+    No SQLite (nó único) a tabela é reconstruída numa única transação, também
+    com a aplicação parada.
+    """
+    if _column_is_binary("sessions", "access_token"):
+        print("sessions já usa hashes binários")
+        return
+
+    if engine.dialect.name == "postgresql":
+        if phase == "prepare":
+            _session_hashes_prepare_postgres()
+        elif phase == "swap":
+            _session_hashes_swap_postgres()
+        else:
+            raise ValueError(f"Fase desconhecida: {phase}")
+    else:
+        _session_hashes_rebuild_sqlite()
+
+
+def _session_hashes_prepare_postgres() -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "ALTER TABLE sessions "
+                "ADD COLUMN IF NOT EXISTS access_token_bin BYTEA, "
+                "ADD COLUMN IF NOT EXISTS refresh_token_bin BYTEA"
+            )
+        )
+
+        # Mantém as colunas novas sincronizadas enquanto a versão antiga grava hex
+        conn.execute(
+            text(
+                """
+                CREATE OR REPLACE FUNCTION sessions_hashes_to_bin() RETURNS trigger AS $$
+                BEGIN
+                    NEW.access_token_bin := decode(NEW.access_token, 'hex');
+                    NEW.refresh_token_bin := decode(NEW.refresh_token, 'hex');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql
+                """
+            )
+        )
+        conn.execute(text("DROP TRIGGER IF EXISTS sessions_hashes_to_bin ON sessions"))
+        conn.execute(
+            text(
+                "CREATE TRIGGER sessions_hashes_to_bin "
+                "BEFORE INSERT OR UPDATE OF access_token, refresh_token ON sessions "
+                "FOR EACH ROW EXECUTE FUNCTION sessions_hashes_to_bin()"
+            )
+        )
+
+    # Preenche em lotes, cada lote na sua própria transação
+    backfill = text(
+        "UPDATE sessions "
+        "SET access_token_bin = decode(access_token, 'hex'), "
+        "refresh_token_bin = decode(refresh_token, 'hex') "
+        "WHERE uuid IN ("
+        "SELECT uuid FROM sessions WHERE access_token_bin IS NULL LIMIT :limit"
+        ")"
+    )
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            updated = conn.execute(backfill, {"limit": BATCH_SIZE}).rowcount
+        total += updated
+        print(f"sessions convertidas: {total}")
+        if updated < BATCH_SIZE:
+            break
+
+    # Índices e NOT NULL validados sem bloquear escritas
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for column in ("access_token_bin", "refresh_token_bin"):
+            conn.execute(
+                text(
+                    f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+                    f"uq_sessions_{column} ON sessions ({column})"
+                )
+            )
+            if not _constraint_exists(conn, f"ck_sessions_{column}"):
+                conn.execute(
+                    text(
+                        f"ALTER TABLE sessions ADD CONSTRAINT ck_sessions_{column} "
+                        f"CHECK ({column} IS NOT NULL) NOT VALID"
+                    )
+                )
+            conn.execute(
+                text(f"ALTER TABLE sessions VALIDATE CONSTRAINT ck_sessions_{column}")
+            )
+
+
+def _session_hashes_swap_postgres() -> None:
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        conn.execute(text("DROP TRIGGER IF EXISTS sessions_hashes_to_bin ON sessions"))
+        conn.execute(text("DROP FUNCTION IF EXISTS sessions_hashes_to_bin()"))
+        conn.execute(
+            text(
+                "ALTER TABLE sessions DROP COLUMN access_token, DROP COLUMN refresh_token"
+            )
+        )
+        for column in ("access_token", "refresh_token"):
+            # O CHECK validado permite SET NOT NULL sem varrer a tabela
+            conn.execute(
+                text(f"ALTER TABLE sessions RENAME COLUMN {column}_bin TO {column}")
+            )
+            conn.execute(
+                text(f"ALTER TABLE sessions ALTER COLUMN {column} SET NOT NULL")
+            )
+            conn.execute(
+                text(
+                    "ALTER TABLE sessions "
+                    f"DROP CONSTRAINT IF EXISTS ck_sessions_{column}_bin"
+                )
+            )
+            if not _constraint_exists(conn, f"uq_sessions_{column}"):
+                conn.execute(
+                    text(
+                        f"ALTER TABLE sessions ADD CONSTRAINT uq_sessions_{column} "
+                        f"UNIQUE USING INDEX uq_sessions_{column}_bin"
+                    )
+                )
+
+
+def _constraint_exists(conn, name: str) -> bool:
+    """Constraint já criada (fases repetidas após uma falha)"""
+    return (
+        conn.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": name}
+        ).first()
+        is not None
+    )
+
+
+def _session_hashes_rebuild_sqlite() -> None:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE sessions_hex AS SELECT * FROM sessions"))
+        conn.execute(text("DROP TABLE sessions"))
+        metadata.tables["sessions"].create(bind=conn)
+
+        # Copia os valores crus, convertendo apenas os hashes; colunas que a
+        # tabela antiga ainda não tem ficam com o default da nova
+        new_columns = metadata.tables["sessions"].columns
+        columns = [
+            row.name
+            for row in conn.execute(text("PRAGMA table_info(sessions_hex)"))
+            if row.name in new_columns
+        ]
+        select_batch = text(
+            f"SELECT rowid, {', '.join(columns)} FROM sessions_hex "
+            "WHERE rowid > :last ORDER BY rowid LIMIT :limit"
+        )
+        insert_row = text(
+            f"INSERT INTO sessions ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + c for c in columns)})"
+        )
+
+        last, total = 0, 0
+        while True:
+            rows = (
+                conn.execute(select_batch, {"last": last, "limit": BATCH_SIZE})
+                .mappings()
+                .all()
+            )
+            if not rows:
+                break
+
+            conn.execute(
+                insert_row,
+                [
+                    {
+                        **{c: row[c] for c in columns},
+                        "access_token": bytes.fromhex(row["access_token"]),
+                        "refresh_token": bytes.fromhex(row["refresh_token"]),
+                    }
+                    for row in rows
+                ],
+            )
+            last = rows[-1]["rowid"]
+            total += len(rows)
+            print(f"sessions convertidas: {total}")
+
+        conn.execute(text("DROP TABLE sessions_hex"))
+
+
+def inline_avatars_to_store() -> None:
+    """Move avatares base64 de users.avatar para o armazenamento de avatares
+
+    A coluna passa a guardar apenas o hash SHA-256 (64 caracteres). Valores
+    que não são imagens em base64 válido são descartados.
+    """
+    avatar_repository = LocalAvatarRepository(root=get_settings().avatar_storage_path)
+
+    select_batch = (
+        select(users.c.uuid, users.c.avatar)
+        .where(func.length(users.c.avatar) > 64)
+        .limit(BATCH_SIZE)
+    )
+
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_batch).fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                # Remove o prefixo de data URI (data:image/png;base64,...)
+                encoded = row.avatar.split(",", 1)[-1]
+                try:
+                    data = base64.b64decode(encoded)
+                except (binascii.Error, ValueError):
+                    data = b""
+
+                avatar_hash = (
+                    avatar_repository.save(data)
+                    if detect_media_type(data[:12])
+                    else None
+                )
+
+                conn.execute(
+                    update(users)
+                    .where(users.c.uuid == row.uuid)
+                    .values(avatar=avatar_hash)
+                )
+
+        total += len(rows)
+        print(f"avatares migrados: {total}")
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE users ALTER COLUMN avatar TYPE VARCHAR(64)"))
+
+
+def session_activity_columns() -> None:
+    """Adiciona sessions.last_seen_at e sessions.request_count
+
+    Colunas anuláveis ou com default constante não reescrevem a tabela.
+    """
+    existing = {c["name"] for c in inspect(engine).get_columns("sessions")}
+
+    with engine.begin() as conn:
+        if "last_seen_at" not in existing:
+            timestamp = (
+                "TIMESTAMP WITH TIME ZONE"
+                if engine.dialect.name == "postgresql"
+                else "DATETIME"
+            )
+            conn.execute(
+                text(f"ALTER TABLE sessions ADD COLUMN last_seen_at {timestamp}")
+            )
+        if "request_count" not in existing:
+            conn.execute(
+                text(
+                    "ALTER TABLE sessions "
+                    "ADD COLUMN request_count INTEGER NOT NULL DEFAULT 0"
+                )
+            )
+
+
+def sessions_active_index() -> None:
+    """Cria o índice parcial das sessões ativas por usuário e data
+
+    Sustenta a política de sessões no login. No PostgreSQL é criado com
+    CONCURRENTLY, sem bloquear escritas; roda no banco padrão e em cada shard.
+    """
+    for database_engine in (engine, *shard_engines.values()):
+        if database_engine.dialect.name != "postgresql":
+            with database_engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "CREATE INDEX IF NOT EXISTS ix_sessions_user_uuid_date_active "
+                        "ON sessions (user_uuid, date) WHERE revoked IS 0"
+                    )
+                )
+            continue
+
+        with database_engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(
+                text(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                    "ix_sessions_user_uuid_date_active "
+                    "ON sessions (user_uuid, date) WHERE revoked IS false"
+                )
+            )
+
+
+def _email_conflicts() -> dict:
+    """E-mails ainda não normalizados que colidem entre si ou com os já gravados
+
+    Retorna {e-mail normalizado: [e-mails em conflito]}. Comparado em Python
+    (normalize_email), igual ao preenchimento.
+    """
+    pending = {}
+    with engine.connect() as conn:
+        rows = conn.execution_options(yield_per=BATCH_SIZE).execute(
+            select(users.c.email).where(users.c.email_normalized.is_(None))
+        )
+        for (email,) in rows:
+            pending.setdefault(normalize_email(email), []).append(email)
+
+        conflicts = {
+            normalized: emails
+            for normalized, emails in pending.items()
+            if len(emails) > 1
+        }
+        keys = list(pending)
+        for start in range(0, len(keys), BATCH_SIZE):
+            taken = conn.execute(
+                select(users.c.email_normalized).where(
+                    users.c.email_normalized.in_(keys[start : start + BATCH_SIZE])
+                )
+            ).scalars()
+            for normalized in taken:
+                conflicts[normalized] = [normalized, *pending[normalized]]
+    return conflicts
+
+
+def users_email_normalized(phase: str = "prepare") -> None:
+    """Adiciona users.email_normalized, preenche e cria o índice único
+
+    - prepare: cria a coluna (anulável), preenche em lotes e cria o índice
+      único. Pode rodar com a versão antiga no ar.
+    - finalize (PostgreSQL): depois do deploy, preenche os usuários criados
+      pela versão antiga nesse intervalo e aplica NOT NULL.
+
+    Se houver contas que diferem apenas na caixa do e-mail, nada é preenchido
+    nem indexado e as duplicatas são listadas para resolução manual (no
+    finalize o índice único já existe e o preenchimento falharia).
+    """
+    if phase not in ("prepare", "finalize"):
+        raise ValueError(f"Fase desconhecida: {phase}")
+
+    existing = {c["name"] for c in inspect(engine).get_columns("users")}
+    if "email_normalized" not in existing:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE users ADD COLUMN email_normalized VARCHAR"))
+
+    conflicts = _email_conflicts()
+    if conflicts:
+        for normalized, emails in conflicts.items():
+            print(f"e-mail duplicado: {normalized} ({', '.join(emails)})")
+        print("e-mails não normalizados, resolva as duplicatas e rode novamente")
+        return
+
+    # Normaliza em Python (normalize_email), igual ao que a aplicação grava
+    select_batch = (
+        select(users.c.uuid, users.c.email)
+        .where(users.c.email_normalized.is_(None))
+        .limit(BATCH_SIZE)
+    )
+    update_row = (
+        update(users)
+        .where(users.c.uuid == bindparam("user_uuid"))
+        .values(email_normalized=bindparam("normalized"))
+    )
+
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_batch).fetchall()
+            if not rows:
+                break
+            conn.execute(
+                update_row,
+                [
+                    {"user_uuid": row.uuid, "normalized": normalize_email(row.email)}
+                    for row in rows
+                ],
+            )
+        total += len(rows)
+        print(f"e-mails normalizados: {total}")
+
+    with engine.connect() as conn:
+        duplicates = conn.execute(
+            select(users.c.email_normalized, func.count())
+            .group_by(users.c.email_normalized)
+            .having(func.count() > 1)
+        ).fetchall()
+    if duplicates:
+        for email_normalized, count in duplicates:
+            print(f"e-mail duplicado: {email_normalized} ({count} contas)")
+        print("índice único não criado, resolva as duplicatas e rode novamente")
+        return
+
+    # No SQLite a coluna segue anulável (NOT NULL exigiria reconstruir a tabela)
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_users_email_normalized "
+                    "ON users (email_normalized)"
+                )
+            )
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if phase == "prepare":
+            # Índice criado sem bloquear escritas
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+                    "uq_users_email_normalized ON users (email_normalized)"
+                )
+            )
+            return
+
+        # NOT NULL via CHECK validado, sem lock exclusivo durante a varredura
+        conn.execute(
+            text(
+                "ALTER TABLE users DROP CONSTRAINT IF EXISTS ck_users_email_normalized"
+            )
+        )
+        conn.execute(
+            text(
+                "ALTER TABLE users ADD CONSTRAINT ck_users_email_normalized "
+                "CHECK (email_normalized IS NOT NULL) NOT VALID"
+            )
+        )
+        conn.execute(
+            text("ALTER TABLE users VALIDATE CONSTRAINT ck_users_email_normalized")
+        )
+        conn.execute(
+            text("ALTER TABLE users ALTER COLUMN email_normalized SET NOT NULL")
+        )
+        conn.execute(
+            text("ALTER TABLE users DROP CONSTRAINT ck_users_email_normalized")
+        )
+
+
+def users_tokens_valid_after() -> None:
+    """Adiciona users.tokens_valid_after (epoch do usuário, anulável)
+
+    A tabela token_epochs é criada pelo create_tables na inicialização.
+    """
+    existing = {c["name"] for c in inspect(engine).get_columns("users")}
+    if "tokens_valid_after" in existing:
+        return
+
+    timestamp = (
+        "TIMESTAMP WITH TIME ZONE"
+        if engine.dialect.name == "postgresql"
+        else "DATETIME"
+    )
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"ALTER TABLE users ADD COLUMN tokens_valid_after {timestamp}")
+        )
+
+
+def users_bucket() -> None:
+    """Adiciona e preenche users.bucket no banco padrão e em cada shard
+
+    O resharding seleciona os usuários de um bucket por essa coluna (índice
+    ix_users_bucket) e se recusa a mover buckets de shards não migrados.
+    """
+    select_batch = (
+        select(users.c.uuid).where(users.c.bucket.is_(None)).limit(BATCH_SIZE)
+    )
+    update_row = (
+        update(users)
+        .where(users.c.uuid == bindparam("user_uuid"))
+        .values(bucket=bindparam("user_bucket"))
+    )
+
+    for database_engine in (engine, *shard_engines.values()):
+        existing = {c["name"] for c in inspect(database_engine).get_columns("users")}
+        if "bucket" not in existing:
+            with database_engine.begin() as conn:
+                conn.execute(text("ALTER TABLE users ADD COLUMN bucket INTEGER"))
+
+        total = 0
+        while True:
+            with database_engine.begin() as conn:
+                uuids = conn.execute(select_batch).scalars().all()
+                if not uuids:
+                    break
+                conn.execute(
+                    update_row,
+                    [
+                        {"user_uuid": uuid, "user_bucket": bucket_for(uuid)}
+                        for uuid in uuids
+                    ],
+                )
+            total += len(uuids)
+            print(f"{database_engine.url.database}: buckets preenchidos: {total}")
+
+        if database_engine.dialect.name != "postgresql":
+            with database_engine.begin() as conn:
+                conn.execute(
+                    text("CREATE INDEX IF NOT EXISTS ix_users_bucket ON users (bucket)")
+                )
+            continue
+
+        # Índice criado sem bloquear escritas
+        with database_engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            conn.execute(
+                text(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                    "ix_users_bucket ON users (bucket)"
+                )
+            )
+
+
+MIGRATIONS = {
+    "session_hashes_to_binary": session_hashes_to_binary,
+    "inline_avatars_to_store": inline_avatars_to_store,
+    "session_activity_columns": session_activity_columns,
+    "sessions_active_index": sessions_active_index,
+    "users_email_normalized": users_email_normalized,
+    "users_tokens_valid_after": users_tokens_valid_after,
+    "users_bucket": users_bucket,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in MIGRATIONS:
+        print(f"Uso: migrations <{'|'.join(MIGRATIONS)}> [fase]")
+        sys.exit(1)
+
+    MIGRATIONS[sys.argv[1]](*sys.argv[2:])
@@ -8,9 +8,11 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Text,
+    LargeBinary,
     UUID,
     func,
     UniqueConstraint,
+    Index,
 )
 
 metadata = MetaData()
@@ -21,14 +23,22 @@ users = Table(
     Column("uuid", UUID, primary_key=True, unique=True, nullable=False),
     Column("name", String, nullable=False),
     Column("email", String, unique=True, nullable=False),
+    # E-mail normalizado (normalize_email), usado no login e na unicidade
+    Column("email_normalized", String, nullable=False),
     Column("password", String, nullable=False),
     Column("role", String, nullable=False, default="user"),
-    Column("avatar", Text),
+    # Hash SHA-256 do avatar no armazenamento endereçado por conteúdo
+    Column("avatar", String(64)),
     Column("fingerprint", Integer, unique=True, nullable=False),
     Column("status", Boolean, default=True),
     Column("date", DateTime(timezone=True), default=func.now()),
+    # Sessões criadas até este instante são inválidas ("sair de todos")
+    Column("tokens_valid_after", DateTime(timezone=True)),
+    # Bucket do sharding (bucket_for do uuid), filtrado no resharding
+    Column("bucket", Integer),
     UniqueConstraint("uuid", name="uq_users_uuid"),
     UniqueConstraint("email", name="uq_users_email"),
+    UniqueConstraint("email_normalized", name="uq_users_email_normalized"),
     UniqueConstraint("fingerprint", name="uq_users_fingerprint"),
 )
 
@@ -36,8 +46,8 @@ sessions = Table(
     "sessions",
     metadata,
     Column("uuid", UUID, primary_key=True, unique=True, nullable=False),
-    Column("access_token", Text, nullable=False),
-    Column("refresh_token", Text, nullable=False),
+    Column("access_token", LargeBinary(32), nullable=False),
+    Column("refresh_token", LargeBinary(32), nullable=False),
     Column("access_token_expires_at", DateTime(timezone=True), nullable=False),
     Column("refresh_token_expires_at", DateTime(timezone=True), nullable=False),
     Column("user_agent", Text),
@@ -51,7 +61,64 @@ sessions = Table(
     ),
     Column("type", String, nullable=False, default="manual"),
     Column("date", DateTime(timezone=True), default=func.now()),
+    Column("last_seen_at", DateTime(timezone=True)),
+    Column("request_count", Integer, nullable=False, default=0, server_default="0"),
     UniqueConstraint("uuid", name="uq_sessions_uuid"),
     UniqueConstraint("access_token", name="uq_sessions_access_token"),
     UniqueConstraint("refresh_token", name="uq_sessions_refresh_token"),
 )
+
+# Trilha de auditoria de login e refresh (gravada pelo write-behind)
+audit_logs = Table(
+    "audit_logs",
+    metadata,
+    Column("uuid", UUID, primary_key=True, nullable=False),
+    Column("event", String, nullable=False),
+    Column("user_uuid", UUID),
+    Column("session_uuid", UUID),
+    Column("email", String),
+    Column("user_agent", Text),
+    Column("ip", String(255)),
+    Column("date", DateTime(timezone=True), nullable=False),
+)
+
+# Diretório do sharding (no banco de DATABASE_URL): e-mail -> usuário
+user_directory = Table(
+    "user_directory",
+    metadata,
+    Column("email_normalized", String, primary_key=True, nullable=False),
+    Column("user_uuid", UUID, nullable=False),
+)
+
+# Shard de cada bucket (hash do user_uuid); state "frozen" bloqueia escritas
+shard_buckets = Table(
+    "shard_buckets",
+    metadata,
+    Column("bucket", Integer, primary_key=True, nullable=False),
+    Column("shard", String, nullable=False),
+    Column("state", String, nullable=False, default="active"),
+)
+
+# Epoch global dos tokens (no banco de DATABASE_URL): tokens com auth_time
+# anterior a valid_after são rejeitados (revogação em massa)
+token_epochs = Table(
+    "token_epochs",
+    metadata,
+    Column("scope", String, primary_key=True, nullable=False),
+    Column("valid_after", DateTime(timezone=True), nullable=False),
+)
+
+# Sessões ativas por usuário, ordenadas por data (revogação e limite de sessões)
+Index(
+    "ix_sessions_user_uuid_date_active",
+    sessions.c.user_uuid,
+    sessions.c.date,
+    postgresql_where=sessions.c.revoked.is_(False),
+    sqlite_where=sessions.c.revoked.is_(False),
+)
+
+# Usuários de um bucket (cópia e limpeza do resharding)
+Index("ix_users_bucket", users.c.bucket)
+
+# Auditoria por usuário em ordem cronológica
+Index("ix_audit_logs_user_uuid_date", audit_logs.c.user_uuid, audit_logs.c.date)
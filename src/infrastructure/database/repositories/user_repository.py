@@ -1,11 +1,19 @@
-import bcrypt
-from sqlalchemy import select, insert, update, column
+from uuid import UUID
+from datetime import datetime
 from dataclasses import dataclass
+from sqlalchemy.exc import IntegrityError
 from src.domain.repositories.user_repository import UserRepository
 from src.domain.services.token_service import TokenService
-from src.infrastructure.database.models import users, sessions
-from src.infrastructure.database.session import get_session
-from src.domain.entities.user import User
+from src.domain.services.password_service import verify_password
+from contextlib import contextmanager
+from functools import partial
+from src.infrastructure.database.session import get_session, on_commit, shard_router
+from src.infrastructure.database.sharding import bucket_for
+from src.infrastructure.database import statements
+from src.infrastructure.database.write_behind import write_behind
+from src.infrastructure.database.token_epochs import token_epochs, GLOBAL_SCOPE
+from src.infrastructure.events.revocations import revocation_notifier
+from src.domain.entities.user import User, normalize_email
 from src.domain.entities.session import Session
 from src.domain.entities.auth_login_response import AuthLoginResponse
 
@@ -15,12 +23,18 @@ class SQLAlchemyUserRepository(UserRepository):
     """Implementação do repositório de usuários usando SQLAlchemy"""
 
     token_service: TokenService
+    session_policy: str = "single"
+    max_sessions: int = 5
 
     def create_user(self, user: User) -> bool:
-        with get_session() as session:
-            # Verificar se o e-mail já existe
+        email_normalized = normalize_email(user.email)
+        with (
+            self._register_email(email_normalized, user.uuid),
+            get_session(shard_key=user.uuid) as session,
+        ):
+            # Verificar se o e-mail já existe (sem diferenciar maiúsculas)
             existing_user = session.execute(
-                select(users).where(column("email") == user.email)
+                statements.select_user_by_email, {"email_normalized": email_normalized}
             ).fetchone()
 
             if existing_user:
@@ -30,44 +44,81 @@ class SQLAlchemyUserRepository(UserRepository):
             new_user = {
                 "name": user.name,
                 "email": user.email,
+                "email_normalized": email_normalized,
                 "role": user.role,
                 "password": user.password,
                 "fingerprint": user.fingerprint,
                 "status": user.status,
                 "uuid": user.uuid,
+                "bucket": bucket_for(user.uuid),
                 "date": user.date,
             }
-            session.execute(insert(users).values(**new_user))
+            session.execute(statements.insert_user, new_user)
 
             return True
 
+    @contextmanager
+    def _register_email(self, email_normalized: str, user_uuid: UUID):
+        """Reserva o e-mail no diretório do sharding (único entre os shards)"""
+        if not shard_router.enabled:
+            yield
+            return
+
+        with get_session() as session:
+            if session.execute(
+                statements.select_directory_user,
+                {"email_normalized": email_normalized},
+            ).first():
+                raise ValueError("Já existe um cadastro com esse e-mail")
+
+            session.execute(
+                statements.insert_directory_user,
+                {"email_normalized": email_normalized, "user_uuid": user_uuid},
+            )
+            yield
+
+    def _locate_email(self, email_normalized: str):
+        """user_uuid do e-mail no diretório, para achar o shard do usuário"""
+        if not shard_router.enabled:
+            return None
+
+        with get_session() as session:
+            return session.execute(
+                statements.select_directory_user,
+                {"email_normalized": email_normalized},
+            ).scalar()
+
     def auth_login(
         self, email: str, password: str, user_agent: str, ip: str
     ) -> AuthLoginResponse:
-        with get_session() as session:
+        email_normalized = normalize_email(email)
+        user_uuid = self._locate_email(email_normalized)
+
+        # E-mail fora do diretório: o banco padrão não tem usuários e a busca
+        # abaixo falha como um e-mail inexistente
+        with get_session(shard_key=user_uuid) as session:
             # Verificar se o usuário existe e está ativo
             user_record = session.execute(
-                select(users).where(column("email") == email, users.c.status.is_(True))
+                statements.select_active_user_by_email,
+                {"email_normalized": email_normalized},
             ).fetchone()
 
-            if not user_record:
-                raise ValueError("Nenhum usuário encontrado")
-
-            # Validar a senha
-            if not bcrypt.checkpw(
-                password.encode("utf-8"), user_record.password.encode("utf-8")
-            ):
-                raise ValueError("A senha está incorreta")
-
-            # Revogar todas as sessões ativas do usuário
-            session.execute(
-                update(sessions)
-                .where(
-                    (sessions.c.user_uuid == user_record.uuid)
-                    & (sessions.c.revoked.is_(False))
-                )
-                .values(revoked=True)
+        # Validar a senha fora de qualquer bloco: o bcrypt não retém conexão
+        # (nem o escritor do SQLite). Sem usuário, o hash fictício tem o mesmo
+        # custo (a existência da conta não aparece no tempo nem na mensagem)
+        if not verify_password(password, user_record.password if user_record else None):
+            write_behind.audit(
+                "login_failed",
+                user_uuid=user_record.uuid if user_record else None,
+                email=email,
+                user_agent=user_agent,
+                ip=ip,
             )
+            raise ValueError("E-mail ou senha incorretos")
+
+        with get_session(shard_key=user_record.uuid) as session:
+            # Aplicar a política de sessões simultâneas
+            self._enforce_session_policy(session, user_record.uuid)
 
             # Gerar par de tokens usando o serviço
             token_pair = self.token_service.generate_token_pair(str(user_record.uuid))
@@ -98,7 +149,16 @@ class SQLAlchemyUserRepository(UserRepository):
                 "uuid": user_session.uuid,
                 "date": user_session.date,
             }
-            session.execute(insert(sessions).values(**session_data))
+            session.execute(statements.insert_session, session_data)
+
+            write_behind.audit(
+                "login",
+                user_uuid=user_record.uuid,
+                session_uuid=user_session.uuid,
+                email=email,
+                user_agent=user_agent,
+                ip=ip,
+            )
 
             return AuthLoginResponse(
                 access_token=token_pair.access_token,
@@ -107,30 +167,107 @@ class SQLAlchemyUserRepository(UserRepository):
                 refresh_token_expires_at=token_pair.refresh_token_expires_at,
             )
 
+    def _enforce_session_policy(self, session, user_uuid) -> None:
+        """Revoga sessões ativas para abrir espaço para a nova sessão"""
+        if self.session_policy == "unlimited":
+            return
+
+        # Revogar todas as sessões ativas do usuário
+        if self.session_policy == "single" or self.max_sessions == 1:
+            revoked = session.execute(
+                statements.revoke_user_sessions, {"session_user_uuid": user_uuid}
+            )
+        else:
+            # Revogar as mais antigas, mantendo max_sessions - 1 + a nova
+            revoked = session.execute(
+                statements.revoke_oldest_user_sessions,
+                {"session_user_uuid": user_uuid, "keep": self.max_sessions - 1},
+            )
+
+        # Conexões avisadas só depois que a revogação estiver confirmada
+        on_commit(
+            session, partial(revocation_notifier.publish, revoked.scalars().all())
+        )
+
     def revoke_session(self, refresh_token: str) -> bool:
-        with get_session() as session:
-            try:
-                # Decodificar o refresh token permitindo tokens expirados
-                payload = self.token_service.decode_token(
-                    refresh_token, verify_exp=False
+        try:
+            # Decodificar o refresh token permitindo tokens expirados
+            payload = self.token_service.decode_token(refresh_token, verify_exp=False)
+
+            refresh_token_random = payload.get("refresh_token")
+
+            if not refresh_token_random:
+                return False
+
+            # Gerar hash do refresh token
+            refresh_token_hash = self.token_service.hash_token(refresh_token_random)
+
+            # Revogar a sessão específica (no shard do usuário do token)
+            with get_session(shard_key=UUID(payload["uuid"])) as session:
+                revoked = (
+                    session.execute(
+                        statements.revoke_session_by_refresh_token,
+                        {"refresh_token_hash": refresh_token_hash},
+                    )
+                    .scalars()
+                    .all()
                 )
+                on_commit(session, partial(revocation_notifier.publish, revoked))
 
-                refresh_token_random = payload.get("refresh_token")
+            return len(revoked) > 0
 
-                if not refresh_token_random:
-                    return False
+        except Exception:
+            return False
 
-                # Gerar hash do refresh token
-                refresh_token_hash = self.token_service.hash_token(refresh_token_random)
+    def update_avatar(self, user_uuid: UUID, avatar_hash: str) -> bool:
+        with get_session(shard_key=user_uuid) as session:
+            result = session.execute(
+                statements.update_user_avatar,
+                {"user_uuid": user_uuid, "avatar_hash": avatar_hash},
+            )
+            return result.rowcount > 0
 
-                # Revogar a sessão específica
-                result = session.execute(
-                    update(sessions)
-                    .where(column("refresh_token") == refresh_token_hash)
-                    .values(revoked=True)
+    def revoke_user_tokens(self, user_uuid: UUID, valid_after: datetime) -> bool:
+        with get_session(shard_key=user_uuid) as session:
+            result = session.execute(
+                statements.revoke_user_tokens,
+                {"user_uuid": user_uuid, "epoch": valid_after},
+            )
+            invalidated = (
+                session.execute(
+                    statements.select_user_sessions_before_epoch,
+                    {"session_user_uuid": user_uuid, "epoch": valid_after},
                 )
+                .scalars()
+                .all()
+            )
+            # Websockets das sessões fechados na hora, como numa revogação
+            on_commit(session, partial(revocation_notifier.publish, invalidated))
 
-                return result.rowcount > 0
+        write_behind.audit("tokens_revoked", user_uuid=user_uuid)
+        return result.rowcount > 0
 
-            except Exception:
-                return False
+    def revoke_all_tokens(self, valid_after: datetime) -> datetime:
+        # Epoch global no banco padrão (diretório, com sharding)
+        params = {"token_scope": GLOBAL_SCOPE, "epoch": valid_after}
+        try:
+            with get_session() as session:
+                if session.execute(statements.update_token_epoch, params).rowcount:
+                    current = session.execute(statements.select_token_epoch, params)
+                    valid_after = current.scalar()
+                else:
+                    session.execute(
+                        statements.insert_token_epoch,
+                        {"scope": GLOBAL_SCOPE, "valid_after": valid_after},
+                    )
+        except IntegrityError:
+            # Outro processo criou o epoch ao mesmo tempo: prevalece o maior
+            with get_session() as session:
+                session.execute(statements.update_token_epoch, params)
+                current = session.execute(statements.select_token_epoch, params)
+                valid_after = current.scalar()
+
+        # Este processo passa a rejeitar na hora; os demais em até um TTL
+        valid_after = token_epochs.update(valid_after)
+        write_behind.audit("all_tokens_revoked")
+        return valid_after
@@ -0,0 +1,227 @@
+"""
+Resharding online: move um bucket de usuários para outro shard
+
+Uso:
+    python -m src.infrastructure.database.resharding status
+    python -m src.infrastructure.database.resharding move <bucket> <shard>
+
+A cópia acontece com o bucket ativo; depois o bucket é congelado (escritas
+falham com ShardMovingError), a diferença é copiada de novo e, se origem e
+destino conferem (contagem e SHA-256 das linhas), o mapa passa a apontar para
+o destino. As esperas de SHARD_MAP_TTL_SECONDS garantem que todos os
+processos enxergaram cada mudança do mapa antes da etapa seguinte.
+"""
+
+import sys
+import time
+import hashlib
+from collections import Counter
+from typing import Dict, Tuple
+from sqlalchemy import select, update, delete, insert, func
+from src.infrastructure.config.settings import get_shard_map_ttl
+from src.infrastructure.database.models import (
+    users,
+    sessions,
+    audit_logs,
+    shard_buckets,
+)
+from src.infrastructure.database.session import (
+    engine,
+    shard_engines,
+    shard_read_engines,
+    shard_router,
+)
+from src.infrastructure.database.sharding import BUCKETS
+
+BATCH_SIZE = 1000
+
+# Ordem de inserção (as sessões referenciam usuários)
+TABLES = (users, sessions, audit_logs)
+
+
+class BucketMismatchError(Exception):
+    """Origem e destino divergem depois da cópia (o bucket volta para a origem)"""
+
+
+def _bucket_users(shard: str, bucket: int):
+    """user_uuids do bucket no shard, em lotes (keyset pelo uuid)"""
+    last = None
+    with shard_read_engines[shard].connect() as conn:
+        while True:
+            query = (
+                select(users.c.uuid)
+                .where(users.c.bucket == bucket)
+                .order_by(users.c.uuid)
+                .limit(BATCH_SIZE)
+            )
+            if last is not None:
+                query = query.where(users.c.uuid > last)
+            uuids = conn.execute(query).scalars().all()
+            if not uuids:
+                return
+            last = uuids[-1]
+            yield uuids
+
+
+def _unbucketed_users(shard: str) -> int:
+    """Usuários sem users.bucket (anteriores à migração users_bucket)"""
+    with shard_read_engines[shard].connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(users).where(users.c.bucket.is_(None))
+        ).scalar()
+
+
+def _user_column(table):
+    return table.c.uuid if table is users else table.c.user_uuid
+
+
+def copy_bucket(bucket: int, source: str, target: str) -> int:
+    """Copia os usuários do bucket com sessões e auditoria (idempotente)"""
+    copied = 0
+    # Leitura pelo pool de leitores: no SQLite o escritor é uma conexão única
+    with shard_read_engines[source].connect() as source_conn:
+        for batch in _bucket_users(source, bucket):
+            rows = {
+                table: source_conn.execute(
+                    select(table).where(_user_column(table).in_(batch))
+                )
+                .mappings()
+                .all()
+                for table in TABLES
+            }
+
+            # Substitui o que uma cópia anterior deixou no destino
+            with shard_engines[target].begin() as target_conn:
+                for table in reversed(TABLES):
+                    target_conn.execute(
+                        delete(table).where(_user_column(table).in_(batch))
+                    )
+                for table in TABLES:
+                    if rows[table]:
+                        target_conn.execute(insert(table), rows[table])
+            copied += len(batch)
+    return copied
+
+
+def bucket_digest(bucket: int, shard: str) -> Dict[str, Tuple[int, str]]:
+    """Contagem e SHA-256 das linhas do bucket no shard, por tabela"""
+    counts = Counter()
+    hashes = {table.name: hashlib.sha256() for table in TABLES}
+    with shard_read_engines[shard].connect() as conn:
+        for batch in _bucket_users(shard, bucket):
+            for table in TABLES:
+                rows = conn.execute(
+                    select(table)
+                    .where(_user_column(table).in_(batch))
+                    .order_by(table.c.uuid)
+                )
+                for row in rows:
+                    counts[table.name] += 1
+                    hashes[table.name].update(repr(tuple(row)).encode())
+    return {
+        table.name: (counts[table.name], hashes[table.name].hexdigest())
+        for table in TABLES
+    }
+
+
+def verify_bucket(bucket: int, source: str, target: str) -> None:
+    """Confere a cópia do bucket antes da troca de dono e da limpeza da origem"""
+    expected = bucket_digest(bucket, source)
+    copied = bucket_digest(bucket, target)
+    differing = [name for name in expected if expected[name] != copied[name]]
+    if differing:
+        details = ", ".join(
+            f"{name} ({expected[name][0]} na origem, {copied[name][0]} no destino)"
+            for name in differing
+        )
+        raise BucketMismatchError(f"Bucket {bucket} divergente: {details}")
+
+
+def purge_bucket(bucket: int, shard: str) -> None:
+    """Remove do shard de origem os usuários do bucket já movido"""
+    for batch in _bucket_users(shard, bucket):
+        with shard_engines[shard].begin() as conn:
+            for table in reversed(TABLES):
+                conn.execute(delete(table).where(_user_column(table).in_(batch)))
+
+
+def _set_bucket(bucket: int, shard: str, state: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            update(shard_buckets)
+            .where(shard_buckets.c.bucket == bucket)
+            .values(shard=shard, state=state)
+        )
+
+
+def move_bucket(bucket: int, target: str) -> None:
+    """Move o bucket para o shard `target` sem parar a aplicação"""
+    if target not in shard_engines:
+        raise ValueError(f"Shard desconhecido: {target}")
+
+    shard_router.refresh()
+    source, state = shard_router.locate_bucket(bucket)
+    if state != "active":
+        # Um move interrompido deixa o bucket congelado: recomeça do início
+        print(f"Bucket {bucket} estava {state}, retomando")
+    if source == target:
+        _set_bucket(bucket, target, "active")
+        print(f"Bucket {bucket} já está em {target}")
+        return
+
+    # Usuários sem bucket não seriam copiados (e ficariam para trás na origem)
+    if _unbucketed_users(source):
+        raise RuntimeError(
+            f"{source} tem usuários sem bucket: rode a migração users_bucket"
+        )
+
+    wait = get_shard_map_ttl() + 1
+
+    # 1. Cópia em massa com o bucket recebendo escritas
+    print(f"Copiando bucket {bucket}: {source} -> {target}")
+    copy_bucket(bucket, source, target)
+
+    # 2. Congela e espera todos os processos pararem de escrever na origem
+    _set_bucket(bucket, source, "frozen")
+    time.sleep(wait)
+
+    # 3. Copia o que mudou desde a primeira cópia, confere e troca o dono
+    copied = copy_bucket(bucket, source, target)
+    try:
+        verify_bucket(bucket, source, target)
+    except BucketMismatchError:
+        # A origem segue completa: o bucket volta a aceitar escritas nela
+        _set_bucket(bucket, source, "active")
+        raise
+    _set_bucket(bucket, target, "active")
+
+    # 4. Leituras antigas (mapa em cache) ainda podem ir à origem por um TTL
+    time.sleep(wait)
+    purge_bucket(bucket, source)
+    print(f"Bucket {bucket} movido para {target} ({copied} usuários)")
+
+
+def status() -> None:
+    """Buckets e usuários por shard"""
+    shard_router.refresh()
+    buckets = Counter(
+        shard_router.locate_bucket(bucket)[0] for bucket in range(BUCKETS)
+    )
+    for shard, shard_engine in shard_engines.items():
+        with shard_engine.connect() as conn:
+            count = conn.execute(select(func.count()).select_from(users)).scalar()
+        print(f"{shard}: {buckets[shard]} buckets, {count} usuários")
+
+
+if __name__ == "__main__":
+    if not shard_router.enabled:
+        print("Sharding desativado (SHARDS vazio)")
+        sys.exit(1)
+
+    if sys.argv[1:2] == ["status"]:
+        status()
+    elif sys.argv[1:2] == ["move"] and len(sys.argv) == 4:
+        move_bucket(int(sys.argv[2]), sys.argv[3])
+    else:
+        print("Uso: resharding status | move <bucket> <shard>")
+        sys.exit(1)
@@ -1,31 +1,354 @@
+import threading
+from uuid import UUID
 from contextlib import contextmanager
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from src.infrastructure.database.models import metadata
-from src.infrastructure.config.settings import get_database_url
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import create_engine, event, Insert, Update, Delete, TextClause
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker, Session
+from src.infrastructure.database.models import metadata, shard_buckets
+from src.infrastructure.database import statements
+from src.infrastructure.database.sharding import (
+    ShardRouter,
+    ShardMovingError,
+    default_assignment,
+)
+from src.infrastructure.config.settings import (
+    get_database_url,
+    get_database_read_url,
+    get_database_prepare_threshold,
+    get_shard_urls,
+    get_shard_map_ttl,
+    get_sqlite_pragmas,
+    get_sqlite_read_pool_size,
+)
 from sqlalchemy.pool import QueuePool
 
 
-# Criar engine do banco de dados
-engine = create_engine(
-    url=get_database_url(),
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_recycle=1800,
-    pool_timeout=30,
-    pool_size=10,
-    max_overflow=20,
+def create_database_engine(url: str, reader: bool = False) -> Engine:
+    """Cria uma engine do banco de dados com as configurações de pool"""
+    if url.startswith("sqlite"):
+        return create_sqlite_engine(url, reader)
+
+    connect_args = {}
+
+    # psycopg: statements repetidos viram prepared statements no servidor
+    if url.startswith("postgresql+psycopg"):
+        connect_args["prepare_threshold"] = get_database_prepare_threshold()
+
+    return create_engine(
+        url=url,
+        connect_args=connect_args,
+        echo=False,
+        poolclass=QueuePool,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        pool_timeout=30,
+        pool_size=10,
+        max_overflow=20,
+    )
+
+
+def is_sqlite_file(url: str) -> bool:
+    """Verifica se a URL é de um banco SQLite em arquivo (não em memória)"""
+    database = make_url(url).database
+    return url.startswith("sqlite") and database not in (None, "", ":memory:")
+
+
+def create_sqlite_engine(url: str, reader: bool = False) -> Engine:
+    """Cria uma engine SQLite em modo WAL com um único escritor
+
+    O SQLite aceita um escritor por vez. A engine de escrita tem uma única
+    conexão e abre transações com BEGIN IMMEDIATE: escritas do processo fazem
+    fila no pool e, entre processos, o busy_timeout espera o lock em vez de
+    falhar com "database is locked" no meio da transação. No modo WAL os
+    leitores (reader=True, somente leitura) rodam em paralelo ao escritor.
+    """
+    in_memory = not is_sqlite_file(url)
+    pragmas = get_sqlite_pragmas()
+
+    database_engine = create_engine(
+        url=url,
+        # O pool garante que cada conexão é usada por uma thread de cada vez
+        connect_args={"check_same_thread": False},
+        echo=False,
+        poolclass=QueuePool,
+        pool_timeout=30,
+        pool_size=get_sqlite_read_pool_size() if reader else 1,
+        max_overflow=0,
+    )
+
+    @event.listens_for(database_engine, "connect")
+    def configure_sqlite_connection(dbapi_connection, connection_record):
+        # pysqlite não emite BEGIN sozinho, o que quebra SAVEPOINT
+        dbapi_connection.isolation_level = None
+
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if reader:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    begin = "BEGIN" if reader else "BEGIN IMMEDIATE"
+
+    @event.listens_for(database_engine, "begin")
+    def begin_sqlite_transaction(connection):
+        connection.exec_driver_sql(begin)
+
+    return database_engine
+
+
+# Criar engine do banco de dados (primário, recebe as escritas)
+engine = create_database_engine(get_database_url())
+
+# Shards de usuários e sessões (vazio: tudo no banco padrão)
+shard_engines = {
+    name: create_database_engine(url) for name, url in get_shard_urls().items()
+}
+shard_read_engines = {
+    name: (
+        create_database_engine(url, reader=True)
+        if is_sqlite_file(url)
+        else shard_engines[name]
+    )
+    for name, url in get_shard_urls().items()
+}
+
+# SQLite com um único escritor: o lock de escrita não pode ficar retido
+SINGLE_WRITER = any(
+    database_engine.dialect.name == "sqlite"
+    for database_engine in (engine, *shard_engines.values())
+)
+
+# Leituras do primário; no SQLite em arquivo, um pool de leitores separado
+primary_read_engine = (
+    create_database_engine(get_database_url(), reader=True)
+    if is_sqlite_file(get_database_url())
+    else engine
+)
+
+# Engine de leitura (réplica), usa as leituras do primário quando não configurada
+read_engine = (
+    create_database_engine(get_database_read_url(), reader=True)
+    if get_database_read_url() != get_database_url()
+    else primary_read_engine
+)
+
+
+def load_shard_buckets():
+    """Lê o mapa de buckets do diretório (pool de leitura: sem disputar o escritor)"""
+    with primary_read_engine.connect() as conn:
+        return {
+            row.bucket: (row.shard, row.state)
+            for row in conn.execute(statements.select_shard_buckets)
+        }
+
+
+shard_router = ShardRouter(
+    sorted(shard_engines), load_shard_buckets, get_shard_map_ttl()
 )
 
+
+class RoutingSession(Session):
+    """Sessão que envia leituras para a réplica e escritas para o primário
+
+    Depois da primeira escrita, as leituras da sessão também vão para a
+    engine de escrita (read-your-writes). Com `shard` definido, leituras e
+    escritas vão para o shard do usuário (sem réplica).
+    """
+
+    def __init__(
+        self,
+        *args,
+        replica: bool = False,
+        shard: Optional[str] = None,
+        writable: bool = True,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+        self.shard = shard
+        self.writable = writable
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        # Escritas sempre vão para o primário (SQL textual pode escrever)
+        writing = self._flushing or isinstance(
+            clause, (Insert, Update, Delete, TextClause)
+        )
+
+        if self.shard is not None:
+            if writing and not self.writable:
+                raise ShardMovingError(f"Bucket do shard {self.shard} em movimentação")
+            if writing or self.wrote:
+                self.wrote = True
+                return shard_engines[self.shard]
+            return shard_read_engines[self.shard]
+
+        # Depois de escrever, as leituras também vão para o primário
+        if writing or self.wrote:
+            self.wrote = True
+            return engine
+        return read_engine if self.replica else primary_read_engine
+
+
 # Criar session factory
-SessionLocal = sessionmaker(expire_on_commit=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, expire_on_commit=False)
+
+
+def on_commit(session: Session, callback: Callable[[], None]) -> None:
+    """Executa `callback` depois do commit que confirmar o bloco atual
+
+    Dentro de uma unidade de trabalho o commit pode acontecer só no fim da
+    requisição. Se o bloco (SAVEPOINT) ou a transação forem desfeitos, o
+    callback é descartado.
+    """
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault("on_commit", []).append((transaction, callback))
+
+
+def _descends_from(transaction, ancestor) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _discard_on_commit(session, previous_transaction):
+    session.info["on_commit"] = [
+        (transaction, callback)
+        for transaction, callback in session.info.get("on_commit", [])
+        if not _descends_from(transaction, previous_transaction)
+    ]
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _run_on_commit(session):
+    # Também dispara ao liberar um SAVEPOINT: espera o commit da transação raiz
+    if session.get_nested_transaction() is not None:
+        return
+    callbacks = session.info.pop("on_commit", [])
+    for _, callback in callbacks:
+        callback()
+
+
+class UnitOfWork:
+    """Sessão e transação únicas de uma requisição
+
+    Permissão, renovação de token e resolvers usam a mesma sessão: no máximo
+    uma conexão do pool por vez e um único ponto de commit. Cada bloco de
+    trabalho roda num SAVEPOINT, então a falha de uma operação desfaz apenas
+    as suas escritas.
+
+    Ao fim de cada bloco externo só de leitura, a transação é encerrada e a
+    conexão volta ao pool: entre awaits a requisição não segura conexão. No
+    SQLite (SINGLE_WRITER) as escritas também são confirmadas ao fim de cada
+    bloco externo: segurar o único escritor entre awaits travaria o event
+    loop na próxima requisição que precisasse escrever.
+    """
+
+    def __init__(self):
+        self.session = SessionLocal()
+        # Sessões não são thread-safe: o threadpool (run_in_threadpool copia
+        # o contexto) e o event loop usam a sessão um de cada vez
+        self.lock = threading.RLock()
+        self.depth = 0
+
+    @contextmanager
+    def transaction(self, replica: bool = False, shard_key: Optional[UUID] = None):
+        """Bloco de trabalho isolado num SAVEPOINT"""
+        with self.lock:
+            session = self.session
+            previous = (session.replica, session.shard, session.writable)
+            session.replica = replica
+            session.shard, session.writable = shard_router.route(shard_key)
+            self.depth += 1
+            try:
+                with session.begin_nested():
+                    yield session
+            finally:
+                self.depth -= 1
+                session.replica, session.shard, session.writable = previous
+                # Também após falhas: o SAVEPOINT já desfez as escritas do bloco
+                if self.depth == 0:
+                    self._release()
+
+    def _release(self) -> None:
+        """Devolve a conexão ao pool entre blocos externos
+
+        Escritas fora do SQLite seguem na transação até o complete().
+        """
+        if not self.session.wrote:
+            self.session.rollback()
+        elif SINGLE_WRITER:
+            self.session.commit()
+            # Leitores do WAL já enxergam o commit
+            self.session.wrote = False
+
+    def complete(self) -> None:
+        """Confirma as escritas; requisições só de leitura não fazem commit"""
+        with self.lock:
+            if self.session.wrote:
+                self.session.commit()
+            else:
+                self.session.rollback()
+
+    def rollback(self) -> None:
+        with self.lock:
+            self.session.rollback()
+
+    def close(self) -> None:
+        with self.lock:
+            self.session.close()
+
+
+# Unidade de trabalho da requisição atual
+_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar(
+    "unit_of_work", default=None
+)
+
+
+@contextmanager
+def unit_of_work():
+    """Abre a unidade de trabalho da requisição
+
+    Dentro do escopo, get_session executa na unidade de trabalho aberta.
+    """
+    work = UnitOfWork()
+    token = _unit_of_work.set(work)
+    try:
+        yield work
+        work.complete()
+    except Exception:
+        work.rollback()
+        raise
+    finally:
+        _unit_of_work.reset(token)
+        work.close()
 
 
 @contextmanager
-def get_session():
-    """Context manager para obter uma sessão do banco de dados"""
-    session = SessionLocal()
+def get_session(replica: bool = False, shard_key: Optional[UUID] = None):
+    """Context manager para obter uma sessão do banco de dados
+
+    Com replica=True as leituras são roteadas para a réplica de leitura.
+    shard_key (user_uuid) direciona a sessão ao shard do usuário; sem
+    sharding configurado, é ignorado. Dentro de uma unidade de trabalho,
+    usa a sessão dela (num SAVEPOINT).
+    """
+    work = _unit_of_work.get()
+    if work is not None:
+        with work.transaction(replica, shard_key) as session:
+            yield session
+        return
+
+    shard, writable = shard_router.route(shard_key)
+    session = SessionLocal(replica=replica, shard=shard, writable=writable)
     try:
         yield session
         session.commit()
@@ -37,5 +360,27 @@ def get_session():
 
 
 def create_tables():
-    """Cria todas as tabelas no banco de dados"""
+    """Cria todas as tabelas no banco de dados
+
+    A réplica recebe o schema pela replicação do primário: criar tabelas nela
+    geraria um schema vazio e divergente.
+    """
     metadata.create_all(bind=engine)
+
+    for shard_engine in shard_engines.values():
+        metadata.create_all(bind=shard_engine)
+
+    # Fixa a distribuição inicial: adicionar shards depois não move usuários
+    # (buckets só mudam de shard pelo resharding)
+    if shard_router.enabled:
+        with engine.begin() as conn:
+            if conn.execute(statements.select_shard_buckets.limit(1)).first() is None:
+                conn.execute(
+                    shard_buckets.insert(),
+                    [
+                        {"bucket": bucket, "shard": shard, "state": state}
+                        for bucket, (shard, state) in default_assignment(
+                            shard_router.shards
+                        ).items()
+                    ],
+                )
@@ -0,0 +1,87 @@
+"""
+Roteamento de usuários e sessões entre shards pelo user_uuid
+
+Cada user_uuid cai em um de BUCKETS buckets (hash estável) e cada bucket
+pertence a um shard. O mapa de buckets fica no banco do diretório
+(DATABASE_URL), em cache por SHARD_MAP_TTL_SECONDS, para que o resharding
+mova buckets sem reiniciar a aplicação.
+"""
+
+import time
+import zlib
+import threading
+from uuid import UUID
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Número fixo de buckets: mover usuários é mover buckets inteiros
+BUCKETS = 1024
+
+
+class ShardMovingError(Exception):
+    """Escrita em um bucket congelado durante o resharding (tente novamente)"""
+
+
+def bucket_for(user_uuid: UUID) -> int:
+    """Bucket estável do usuário"""
+    return zlib.crc32(user_uuid.bytes) % BUCKETS
+
+
+def default_assignment(shards: List[str]) -> Dict[int, Tuple[str, str]]:
+    """Distribuição inicial: buckets em rodízio entre os shards"""
+    names = sorted(shards)
+    return {bucket: (names[bucket % len(names)], "active") for bucket in range(BUCKETS)}
+
+
+class ShardRouter:
+    """Resolve o shard de um user_uuid a partir do mapa de buckets"""
+
+    def __init__(
+        self,
+        shards: List[str],
+        load_buckets: Callable[[], Dict[int, Tuple[str, str]]],
+        ttl: float = 5.0,
+    ):
+        self.shards = shards
+        self.load_buckets = load_buckets
+        self.ttl = ttl
+        self._buckets: Dict[int, Tuple[str, str]] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.shards)
+
+    def locate(self, user_uuid: UUID) -> Tuple[str, bool]:
+        """Retorna (shard, aceita escrita) do usuário"""
+        shard, state = self.locate_bucket(bucket_for(user_uuid))
+        return shard, state == "active"
+
+    def locate_bucket(self, bucket: int) -> Tuple[str, str]:
+        """Retorna (shard, estado) do bucket"""
+        if self._expired():
+            with self._lock:
+                # Só o primeiro a obter o lock recarrega; os demais usam o novo mapa
+                if self._expired():
+                    self._reload()
+        return self._buckets[bucket]
+
+    def route(self, user_uuid: Optional[UUID]) -> Tuple[Optional[str], bool]:
+        """Como locate, mas (None, True) = banco padrão sem sharding ou sem usuário"""
+        if not self.enabled or user_uuid is None:
+            return None, True
+        return self.locate(user_uuid)
+
+    def refresh(self) -> None:
+        """Recarrega o mapa de buckets (buckets ausentes usam o rodízio)"""
+        with self._lock:
+            self._reload()
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def _reload(self) -> None:
+        buckets = default_assignment(self.shards)
+        buckets.update(self.load_buckets())
+        self._buckets = buckets
+        self._loaded_at = time.monotonic()
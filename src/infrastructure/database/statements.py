@@ -0,0 +1,204 @@
+"""
+Registro de statements pré-construídos para os caminhos quentes de autenticação
+
+Os statements são montados uma única vez com parâmetros nomeados (bindparam),
+o que mantém a mesma chave no cache de compilação do SQLAlchemy e, no
+PostgreSQL, permite que o psycopg use prepared statements no servidor.
+"""
+
+from sqlalchemy import select, insert, update, bindparam, case
+from src.infrastructure.database.models import (
+    users,
+    sessions,
+    audit_logs,
+    user_directory,
+    shard_buckets,
+    token_epochs,
+)
+
+# Sessão criada depois do epoch do usuário ("sair de todos" não a revogou)
+session_after_user_epoch = users.c.tokens_valid_after.is_(None) | (
+    sessions.c.date > users.c.tokens_valid_after
+)
+
+
+# Usuários (busca pelo e-mail normalizado, coberta pelo índice único)
+select_user_by_email = select(users).where(
+    users.c.email_normalized == bindparam("email_normalized")
+)
+
+select_active_user_by_email = select(users).where(
+    users.c.email_normalized == bindparam("email_normalized"),
+    users.c.status.is_(True),
+)
+
+insert_user = insert(users)
+
+update_user_avatar = (
+    update(users)
+    .where(users.c.uuid == bindparam("user_uuid"))
+    .values(avatar=bindparam("avatar_hash"))
+)
+
+# Usuário autenticado a partir do access token da sessão (colunas na ordem
+# dos campos de Principal)
+select_session_user = (
+    select(
+        users.c.uuid,
+        users.c.name,
+        users.c.email,
+        users.c.role,
+        users.c.fingerprint,
+        users.c.status,
+        users.c.avatar,
+        users.c.date,
+        sessions.c.uuid.label("session_uuid"),
+    )
+    .select_from(users.join(sessions, users.c.uuid == sessions.c.user_uuid))
+    .where(
+        (users.c.uuid == bindparam("user_uuid"))
+        & (sessions.c.access_token == bindparam("access_token_hash"))
+        & (sessions.c.revoked.is_(False))
+        & (users.c.status.is_(True))
+        & session_after_user_epoch
+    )
+)
+
+# Epoch por usuário: invalida todas as sessões com uma escrita de uma linha
+revoke_user_tokens = (
+    update(users)
+    .where(users.c.uuid == bindparam("user_uuid"))
+    .values(tokens_valid_after=bindparam("epoch"))
+)
+
+# Sessões ativas invalidadas pelo epoch do usuário (avisa websockets abertos)
+select_user_sessions_before_epoch = select(sessions.c.uuid).where(
+    (sessions.c.user_uuid == bindparam("session_user_uuid"))
+    & (sessions.c.revoked.is_(False))
+    & (sessions.c.date <= bindparam("epoch"))
+)
+
+# Sessões (as revogações retornam os uuids para avisar websockets abertos)
+insert_session = insert(sessions)
+
+# Sessão ainda válida (revalidação de conexões websocket)
+select_active_session = (
+    select(sessions.c.uuid)
+    .select_from(sessions.join(users, users.c.uuid == sessions.c.user_uuid))
+    .where(
+        (sessions.c.uuid == bindparam("session_uuid"))
+        & (sessions.c.revoked.is_(False))
+        & (sessions.c.refresh_token_expires_at > bindparam("now"))
+        & (sessions.c.date > bindparam("global_epoch"))
+        & (users.c.status.is_(True))
+        & session_after_user_epoch
+    )
+)
+
+revoke_user_sessions = (
+    update(sessions)
+    .where(
+        (sessions.c.user_uuid == bindparam("session_user_uuid"))
+        & (sessions.c.revoked.is_(False))
+    )
+    .values(revoked=True)
+    .returning(sessions.c.uuid)
+)
+
+# Mantém apenas as `keep` sessões ativas mais recentes do usuário
+revoke_oldest_user_sessions = (
+    update(sessions)
+    .where(
+        sessions.c.uuid.in_(
+            select(sessions.c.uuid)
+            .where(
+                (sessions.c.user_uuid == bindparam("session_user_uuid"))
+                & (sessions.c.revoked.is_(False))
+            )
+            .order_by(sessions.c.date.desc())
+            .offset(bindparam("keep"))
+        )
+    )
+    .values(revoked=True)
+    .returning(sessions.c.uuid)
+)
+
+revoke_session_by_refresh_token = (
+    update(sessions)
+    .where(sessions.c.refresh_token == bindparam("refresh_token_hash"))
+    .values(revoked=True)
+    .returning(sessions.c.uuid)
+)
+
+revoke_user_session_by_refresh_token = (
+    update(sessions)
+    .where(
+        (sessions.c.user_uuid == bindparam("session_user_uuid"))
+        & (sessions.c.refresh_token == bindparam("refresh_token_hash"))
+    )
+    .values(revoked=True)
+    .returning(sessions.c.uuid)
+)
+
+rotate_access_token = (
+    update(sessions)
+    .where(
+        (sessions.c.user_uuid == bindparam("session_user_uuid"))
+        & (sessions.c.refresh_token == bindparam("refresh_token_hash"))
+        & (sessions.c.access_token == bindparam("current_access_token_hash"))
+        & (sessions.c.revoked.is_(False))
+        & ~select(users.c.uuid)
+        .where(
+            (users.c.uuid == sessions.c.user_uuid)
+            & (users.c.tokens_valid_after >= sessions.c.date)
+        )
+        .exists()
+    )
+    .values(
+        access_token=bindparam("new_access_token_hash"),
+        access_token_expires_at=bindparam("new_access_token_expires_at"),
+    )
+)
+
+# Atividade das sessões e auditoria (write-behind, executados em lote)
+touch_session = (
+    update(sessions)
+    .where(sessions.c.uuid == bindparam("session_uuid"))
+    .values(
+        last_seen_at=bindparam("seen_at"),
+        request_count=sessions.c.request_count + bindparam("increment"),
+    )
+)
+
+insert_audit_log = insert(audit_logs)
+
+# Sharding: diretório e-mail -> usuário e mapa de buckets (banco padrão)
+select_directory_user = select(user_directory.c.user_uuid).where(
+    user_directory.c.email_normalized == bindparam("email_normalized")
+)
+
+insert_directory_user = insert(user_directory)
+
+select_shard_buckets = select(
+    shard_buckets.c.bucket, shard_buckets.c.shard, shard_buckets.c.state
+)
+
+# Epoch global dos tokens
+select_token_epoch = select(token_epochs.c.valid_after).where(
+    token_epochs.c.scope == bindparam("token_scope")
+)
+
+# Epoch só avança: uma revogação com data anterior não revalida sessões
+_epoch = bindparam("epoch", type_=token_epochs.c.valid_after.type)
+update_token_epoch = (
+    update(token_epochs)
+    .where(token_epochs.c.scope == bindparam("token_scope"))
+    .values(
+        valid_after=case(
+            (token_epochs.c.valid_after < _epoch, _epoch),
+            else_=token_epochs.c.valid_after,
+        )
+    )
+)
+
+insert_token_epoch = insert(token_epochs)
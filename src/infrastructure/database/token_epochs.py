@@ -0,0 +1,91 @@
+"""
+Epoch global dos tokens: revogação em massa com a escrita de uma linha
+
+Os tokens levam `auth_time` (instante do login, mantido na renovação). Tokens
+com auth_time até o epoch global são rejeitados antes de qualquer consulta.
+O epoch fica em cache por TOKEN_EPOCH_CACHE_SECONDS; o processo que o altera
+atualiza o próprio cache na hora.
+"""
+
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+from src.infrastructure.config.settings import get_token_epoch_ttl
+from src.infrastructure.database import statements
+from src.infrastructure.database.session import primary_read_engine
+
+GLOBAL_SCOPE = "global"
+
+# Sem epoch global: todas as sessões são posteriores
+EPOCH_ZERO = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _as_utc(date: datetime) -> datetime:
+    # SQLite devolve datas sem fuso (gravadas em UTC)
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+
+class TokenEpochs:
+    """Epoch global em cache, recarregado a cada `ttl` segundos"""
+
+    def __init__(self, load: Callable[[], Optional[datetime]], ttl: float = 5.0):
+        self.load = load
+        self.ttl = ttl
+        self._valid_after: Optional[datetime] = None
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def valid_after(self) -> Optional[datetime]:
+        if self._expired():
+            with self._lock:
+                # Só o primeiro a obter o lock recarrega; os demais usam o novo valor
+                if self._expired():
+                    self._reload()
+        return self._valid_after
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        """Token emitido até o epoch global (tokens sem auth_time contam como 0)"""
+        valid_after = self.valid_after
+        return (
+            valid_after is not None
+            and payload.get("auth_time", 0) <= valid_after.timestamp()
+        )
+
+    def refresh(self) -> None:
+        """Recarrega o epoch do banco"""
+        with self._lock:
+            self._reload()
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def _reload(self) -> None:
+        valid_after = self.load()
+        self._valid_after = None if valid_after is None else _as_utc(valid_after)
+        self._loaded_at = time.monotonic()
+
+    def update(self, valid_after: datetime) -> datetime:
+        """Aplica um novo epoch neste processo sem esperar o TTL
+
+        Como no banco, o epoch só avança; retorna o epoch em vigor.
+        """
+        valid_after = _as_utc(valid_after)
+        with self._lock:
+            if self._valid_after is not None and self._valid_after > valid_after:
+                valid_after = self._valid_after
+            self._valid_after = valid_after
+            self._loaded_at = time.monotonic()
+        return valid_after
+
+
+def load_global_epoch() -> Optional[datetime]:
+    """Lê o epoch global (pool de leitura do primário: sem atraso de réplica)"""
+    with primary_read_engine.connect() as conn:
+        return conn.execute(
+            statements.select_token_epoch, {"token_scope": GLOBAL_SCOPE}
+        ).scalar()
+
+
+token_epochs = TokenEpochs(load_global_epoch, get_token_epoch_ttl())
@@ -0,0 +1,170 @@
+"""
+Buffer write-behind para atividade de sessões e trilha de auditoria
+
+As escritas ficam em memória e são gravadas por uma thread em segundo plano,
+em lotes, por tempo ou por tamanho. Atualizações da mesma sessão são
+coalescidas em uma única linha. A memória é limitada: acima do limite os
+itens mais antigos são descartados. Com sharding, cada lote vai para o shard
+do usuário; um shard indisponível (ou em resharding) perde só o próprio lote.
+"""
+
+import threading
+import structlog
+from uuid import UUID, uuid4
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+from src.infrastructure.config.settings import get_settings
+from src.infrastructure.database.session import get_session, shard_router
+from src.infrastructure.database import statements
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class WriteBehindBuffer:
+    """Coalesce e grava em lote a atividade das sessões e eventos de auditoria"""
+
+    flush_interval: float = 1.0
+    flush_size: int = 500
+    max_pending: int = 10000
+    dropped: int = 0
+    flushed: int = 0
+    _activity: Dict[UUID, List] = field(default_factory=dict)
+    _events: Deque[dict] = field(default_factory=deque)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    _wakeup: threading.Event = field(default_factory=threading.Event)
+    _stopping: threading.Event = field(default_factory=threading.Event)
+    _thread: Optional[threading.Thread] = None
+
+    def touch_session(
+        self, session_uuid: UUID, user_uuid: Optional[UUID] = None
+    ) -> None:
+        """Registra uma requisição autenticada pela sessão (do usuário user_uuid)"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entry = self._activity.get(session_uuid)
+            if entry:
+                entry[0] = now
+                entry[1] += 1
+                return
+
+            # Descarta a sessão pendente mais antiga (ordem de inserção)
+            if len(self._activity) >= self.max_pending:
+                del self._activity[next(iter(self._activity))]
+                self.dropped += 1
+
+            self._activity[session_uuid] = [now, 1, user_uuid]
+            pending = len(self._activity) + len(self._events)
+
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def audit(
+        self,
+        event: str,
+        user_uuid: Optional[UUID] = None,
+        session_uuid: Optional[UUID] = None,
+        email: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        ip: Optional[str] = None,
+    ) -> None:
+        """Registra um evento de auditoria (login, refresh, falhas)"""
+        record = {
+            "uuid": uuid4(),
+            "event": event,
+            "user_uuid": user_uuid,
+            "session_uuid": session_uuid,
+            "email": email,
+            "user_agent": user_agent,
+            "ip": ip,
+            "date": datetime.now(timezone.utc),
+        }
+        with self._lock:
+            if len(self._events) >= self.max_pending:
+                self._events.popleft()
+                self.dropped += 1
+
+            self._events.append(record)
+            pending = len(self._activity) + len(self._events)
+
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Grava tudo o que estiver pendente em statements de múltiplas linhas"""
+        with self._lock:
+            activity, self._activity = self._activity, {}
+            events, self._events = self._events, deque()
+
+        if not activity and not events:
+            return
+
+        # Um lote por shard; qualquer usuário do grupo serve de chave do shard
+        batches: Dict[Optional[str], tuple] = {}
+        for session_uuid, (seen_at, count, user_uuid) in activity.items():
+            touches = batches.setdefault(
+                shard_router.route(user_uuid)[0], (user_uuid, [], [])
+            )[1]
+            touches.append(
+                {"session_uuid": session_uuid, "seen_at": seen_at, "increment": count}
+            )
+        for record in events:
+            batches.setdefault(
+                shard_router.route(record["user_uuid"])[0],
+                (record["user_uuid"], [], []),
+            )[2].append(record)
+
+        for shard_key, touches, records in batches.values():
+            try:
+                with get_session(shard_key=shard_key) as session:
+                    if touches:
+                        session.execute(statements.touch_session, touches)
+                    if records:
+                        session.execute(statements.insert_audit_log, records)
+
+                self.flushed += len(touches) + len(records)
+            except Exception as e:
+                # Perder atividade/auditoria não pode derrubar as requisições
+                with self._lock:
+                    self.dropped += len(touches) + len(records)
+                logger.error(
+                    "write_behind_flush_failed",
+                    error=str(e),
+                    dropped=len(touches) + len(records),
+                )
+
+    def start(self) -> None:
+        """Inicia a thread de gravação em segundo plano"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Para a thread e faz a gravação final"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+# Buffer compartilhado pelo processo
+write_behind = WriteBehindBuffer(
+    flush_interval=get_settings().write_behind_flush_interval_ms / 1000,
+    flush_size=get_settings().write_behind_flush_size,
+    max_pending=get_settings().write_behind_max_pending,
+)
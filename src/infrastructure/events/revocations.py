@@ -0,0 +1,54 @@
+"""
+Aviso de revogação de sessões para conexões de longa duração (websockets)
+
+O aviso é apenas em processo: conexões abertas em outros processos percebem
+a revogação na revalidação periódica.
+"""
+
+import asyncio
+import threading
+from uuid import UUID
+from typing import Dict, Iterable, Set, Tuple
+
+
+class RevocationNotifier:
+    """Registro de conexões interessadas na revogação de cada sessão"""
+
+    def __init__(self):
+        # Revogações acontecem no event loop, no threadpool ou em scripts
+        self._lock = threading.Lock()
+        self._listeners: Dict[
+            UUID, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]
+        ] = {}
+
+    def subscribe(self, session_uuid: UUID) -> asyncio.Event:
+        """Retorna um evento sinalizado quando a sessão for revogada"""
+        listener = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._listeners.setdefault(session_uuid, set()).add(listener)
+        return listener[1]
+
+    def unsubscribe(self, session_uuid: UUID, event: asyncio.Event) -> None:
+        with self._lock:
+            listeners = self._listeners.get(session_uuid, set())
+            listeners.difference_update(
+                {item for item in listeners if item[1] is event}
+            )
+            if not listeners:
+                self._listeners.pop(session_uuid, None)
+
+    def publish(self, session_uuids: Iterable[UUID]) -> None:
+        """Sinaliza as conexões das sessões revogadas"""
+        with self._lock:
+            listeners = [
+                listener
+                for session_uuid in session_uuids
+                for listener in self._listeners.get(session_uuid, ())
+            ]
+
+        for loop, event in listeners:
+            loop.call_soon_threadsafe(event.set)
+
+
+# Instância única da aplicação
+revocation_notifier = RevocationNotifier()
@@ -0,0 +1,185 @@
+"""
+Logs estruturados (structlog) sem I/O no event loop
+
+Os eventos entram numa fila limitada e são formatados e escritos por uma
+thread em segundo plano (QueueListener). Com a fila cheia, o evento é
+descartado em vez de bloquear a requisição. Eventos idênticos repetidos
+(ex.: tokens inválidos em massa) são limitados por janela de tempo, e o
+primeiro evento da janela seguinte informa quantos foram suprimidos.
+"""
+
+import sys
+import time
+import queue
+import logging
+import threading
+import structlog
+from typing import Dict, Hashable, List, Optional
+from logging.handlers import QueueHandler, QueueListener
+from structlog.contextvars import get_contextvars
+
+# Limite de chaves distintas acompanhadas pelo rate limit
+MAX_KEYS = 10000
+
+
+class RateLimiter:
+    """Permite `limit` eventos por chave a cada `interval` segundos"""
+
+    def __init__(self, limit: int, interval: float):
+        self.limit = limit
+        self.interval = interval
+        self._windows: Dict[Hashable, List] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: Hashable) -> Optional[int]:
+        """None descarta o evento; senão, quantos foram suprimidos antes dele"""
+        if self.limit <= 0:
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if len(self._windows) >= MAX_KEYS:
+                    self._windows.clear()
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                return suppressed
+
+            if window[1] < self.limit:
+                window[1] += 1
+                return 0
+
+            window[2] += 1
+            return None
+
+    def __call__(self, logger, method_name: str, event_dict: dict) -> dict:
+        """Processor do structlog"""
+        suppressed = self.allow(
+            (method_name, event_dict.get("event"), event_dict.get("error"))
+        )
+        if suppressed is None:
+            raise structlog.DropEvent
+        if suppressed:
+            event_dict["suppressed"] = suppressed
+        return event_dict
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enfileira sem formatar e sem bloquear (fila cheia descarta o evento)
+
+    Logs de bibliotecas (stdlib) passam pelo mesmo rate limit e levam o
+    contexto da requisição, que não existe na thread de escrita.
+    """
+
+    def __init__(self, log_queue: queue.Queue, limiter: RateLimiter):
+        super().__init__(log_queue)
+        self.limiter = limiter
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Eventos do structlog chegam como dict e já passaram pelo rate limit
+        if not isinstance(record.msg, dict):
+            suppressed = self.limiter.allow(
+                (record.name, record.levelno, str(record.msg))
+            )
+            if suppressed is None:
+                return
+            record.context = get_contextvars()
+            if suppressed:
+                record.context["suppressed"] = suppressed
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def merge_record_context(logger, method_name: str, event_dict: dict) -> dict:
+    """Contexto capturado no emit dos logs de bibliotecas"""
+    event_dict.update(getattr(event_dict["_record"], "context", {}))
+    return event_dict
+
+
+_listener: Optional[QueueListener] = None
+_running = False
+
+
+def configure_logging(
+    level: str = "INFO",
+    format: str = "json",
+    queue_size: int = 10000,
+    rate_limit: int = 10,
+    rate_limit_interval: float = 10.0,
+) -> NonBlockingQueueHandler:
+    """Configura structlog e o logging padrão e inicia a thread de escrita"""
+    global _listener
+    stop_logging()
+
+    limiter = RateLimiter(rate_limit, rate_limit_interval)
+    timestamper = structlog.processors.TimeStamper(fmt="iso", utc=True)
+    renderer = (
+        structlog.processors.JSONRenderer()
+        if format == "json"
+        else structlog.dev.ConsoleRenderer(colors=False)
+    )
+
+    # Na thread de escrita: formatação e serialização
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            foreign_pre_chain=[
+                structlog.stdlib.add_log_level,
+                structlog.stdlib.add_logger_name,
+                timestamper,
+                merge_record_context,
+            ],
+            processors=[
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                structlog.processors.format_exc_info,
+                renderer,
+            ],
+        )
+    )
+
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size), limiter)
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    # Na requisição: filtro de nível, contexto, rate limit e enfileiramento
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.add_logger_name,
+            limiter,
+            timestamper,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(level)
+        ),
+        cache_logger_on_first_use=True,
+    )
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    start_logging()
+    return handler
+
+
+def start_logging() -> None:
+    """Inicia a thread de escrita (se ainda não estiver rodando)"""
+    global _running
+    if _listener is not None and not _running:
+        _listener.start()
+        _running = True
+
+
+def stop_logging() -> None:
+    """Escreve os eventos pendentes e para a thread"""
+    global _running
+    if _listener is not None and _running:
+        _listener.stop()
+        _running = False
@@ -0,0 +1,82 @@
+"""
+Armazenamento local de avatares endereçado por conteúdo
+"""
+
+import os
+import hashlib
+import tempfile
+from io import BytesIO
+from dataclasses import dataclass
+from typing import Optional
+from src.domain.repositories.avatar_repository import AvatarRepository
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional, sem ele não há miniaturas
+    Image = None
+
+
+@dataclass
+class LocalAvatarRepository(AvatarRepository):
+    """Avatares em disco, nomeados pelo SHA-256 do conteúdo (deduplicados)"""
+
+    root: str
+    thumbnail_size: int = 128
+
+    def save(self, data: bytes) -> str:
+        avatar_hash = hashlib.sha256(data).hexdigest()
+        path = self._path_for(avatar_hash)
+
+        # Conteúdo idêntico já armazenado
+        if os.path.exists(path):
+            return avatar_hash
+
+        # A miniatura vem antes: o original só existe quando tudo foi gravado
+        thumbnail = self._thumbnail(data)
+        if thumbnail:
+            self._write_atomic(path + ".thumb", thumbnail)
+
+        self._write_atomic(path, data)
+
+        return avatar_hash
+
+    def path(self, avatar_hash: str, thumbnail: bool = False) -> Optional[str]:
+        path = self._path_for(avatar_hash)
+
+        # Sem miniatura gerada, serve o original
+        if thumbnail and os.path.exists(path + ".thumb"):
+            return path + ".thumb"
+        return path if os.path.exists(path) else None
+
+    def _path_for(self, avatar_hash: str) -> str:
+        """Distribui os arquivos em subdiretórios para evitar diretórios enormes"""
+        return os.path.join(self.root, avatar_hash[:2], avatar_hash[2:4], avatar_hash)
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        """Grava num arquivo temporário e renomeia, leitores nunca veem arquivo parcial"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def _thumbnail(self, data: bytes) -> Optional[bytes]:
+        """Gera a miniatura no mesmo formato da imagem original"""
+        if Image is None:
+            return None
+
+        try:
+            with Image.open(BytesIO(data)) as image:
+                image_format = image.format
+                image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+                output = BytesIO()
+                image.save(output, format=image_format)
+                return output.getvalue()
+        except Exception:
+            return None
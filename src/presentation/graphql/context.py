@@ -2,9 +2,14 @@
 Contexto GraphQL com acesso aos objetos Request e Response
 """
 
+import asyncio
+from uuid import UUID
 from strawberry.fastapi import BaseContext
 from dataclasses import dataclass
+from typing import Optional
 from src.infrastructure.config.settings import Settings
+from src.domain.entities.principal import Principal
+from src.infrastructure.database.session import UnitOfWork
 from src.presentation.graphql.user.resolver import UserResolvers
 
 
@@ -14,3 +19,18 @@ class GraphQLContext(BaseContext):
 
     settings: Settings
     user_resolvers: UserResolvers
+
+    # Autenticação resolvida uma vez por requisição (compartilhada em lotes)
+    authenticated: Optional[bool] = None
+    auth_message: Optional[str] = None
+    user: Optional[Principal] = None
+
+    # Sessão e transação únicas da requisição (ausente em websockets)
+    unit_of_work: Optional[UnitOfWork] = None
+
+    # Instante (time.monotonic) antes do qual a resposta não sai (login)
+    respond_not_before: float = 0.0
+
+    # Websockets: sessão autenticada e tarefa que a revalida
+    session_uuid: Optional[UUID] = None
+    session_watch: Optional[asyncio.Task] = None
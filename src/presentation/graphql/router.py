@@ -0,0 +1,91 @@
+"""
+Router GraphQL com unidade de trabalho por requisição e websockets
+autenticados uma única vez por conexão
+"""
+
+import time
+import asyncio
+from contextlib import suppress
+from starlette.concurrency import run_in_threadpool
+from structlog.contextvars import bound_contextvars
+from strawberry.exceptions import ConnectionRejectionError
+from strawberry.fastapi import GraphQLRouter
+from strawberry.types.unset import UNSET
+from src.domain.auth.permissions import authenticate_connection, is_session_active
+from src.infrastructure.database.session import unit_of_work
+from src.infrastructure.events.revocations import revocation_notifier
+from src.presentation.http.graphql_request import query_name
+
+# Código de fechamento para sessões revogadas (faixa 4000-4999 da aplicação)
+SESSION_REVOKED = 4401
+
+
+class RequestScopedGraphQLRouter(GraphQLRouter):
+    """Executa as operações HTTP (inclusive lotes) numa única unidade de trabalho"""
+
+    async def execute_operation(self, request, context, root_value, sub_response):
+        try:
+            with unit_of_work() as work:
+                context.unit_of_work = work
+                return await super().execute_operation(
+                    request, context, root_value, sub_response
+                )
+        finally:
+            # Piso de tempo de resposta (login) aguardado depois do commit,
+            # sem conexão nem locks retidos
+            delay = context.respond_not_before - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def execute_single(self, *args, request_data, **kwargs):
+        # Operações de um lote rodam em tasks próprias (gather): contexto isolado
+        operation = query_name(request_data.operation_name, request_data.query)
+        with bound_contextvars(operation=operation):
+            return await super().execute_single(
+                *args, request_data=request_data, **kwargs
+            )
+
+    async def run(self, request, context=UNSET, root_value=UNSET):
+        try:
+            return await super().run(request, context, root_value)
+        finally:
+            # Conexão websocket encerrada: para a revalidação da sessão
+            if getattr(context, "session_watch", None):
+                context.session_watch.cancel()
+
+    async def on_ws_connect(self, context):
+        # Consultas síncronas ao banco fora do event loop
+        try:
+            await run_in_threadpool(authenticate_connection, context)
+        except ValueError as e:
+            raise ConnectionRejectionError() from e
+
+        if context.session_uuid is not None:
+            context.session_watch = asyncio.create_task(self.watch_session(context))
+        return UNSET
+
+    async def watch_session(self, context) -> None:
+        """Fecha o websocket quando a sessão é revogada ou deixa de ser válida"""
+        revoked = revocation_notifier.subscribe(context.session_uuid)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(
+                        revoked.wait(), timeout=context.settings.ws_revalidate_seconds
+                    )
+                    break
+                except asyncio.TimeoutError:
+                    # Revogações feitas em outros processos
+                    if not await run_in_threadpool(
+                        is_session_active, context.session_uuid, context.user.uuid
+                    ):
+                        break
+
+            context.authenticated = False
+            context.auth_message = "Session revoked"
+            with suppress(RuntimeError):
+                await context.request.close(
+                    code=SESSION_REVOKED, reason="Session revoked"
+                )
+        finally:
+            revocation_notifier.unsubscribe(context.session_uuid, revoked)
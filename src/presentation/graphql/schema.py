@@ -14,11 +14,20 @@ Mutation = merge_types("Mutation", (UserMutation,))
 Subscription = merge_types("Subscription", (UserSubscription,))
 
 
-def create_schema() -> strawberry.Schema:
-    """Cria o schema GraphQL federado"""
+def create_schema(max_batch_size: int = 0) -> strawberry.Schema:
+    """Cria o schema GraphQL federado
+
+    Com max_batch_size > 0 o endpoint aceita um array JSON de operações.
+    """
     return strawberry.Schema(
         query=Query,
         mutation=Mutation,
         subscription=Subscription,
-        config=StrawberryConfig(auto_camel_case=False, relay_max_results=5),
+        config=StrawberryConfig(
+            auto_camel_case=False,
+            relay_max_results=5,
+            batching_config=(
+                {"max_operations": max_batch_size} if max_batch_size else None
+            ),
+        ),
     )
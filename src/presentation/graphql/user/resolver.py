@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from uuid import UUID
+from datetime import datetime
 from src.application.use_cases.user_use_cases import UserUseCases
 from src.domain.entities.user import User
 
@@ -21,3 +23,12 @@ class UserResolvers:
 
     def revoke_session(self, refresh_token: str) -> bool:
         return self.user_use_cases.revoke_session(refresh_token)
+
+    def revoke_user_tokens(self, user_uuid: UUID) -> bool:
+        return self.user_use_cases.revoke_user_tokens(user_uuid)
+
+    def revoke_all_tokens(self, before: Optional[datetime] = None) -> datetime:
+        return self.user_use_cases.revoke_all_tokens(before)
+
+    def update_avatar(self, user_uuid: UUID, data: bytes) -> str:
+        return self.user_use_cases.update_avatar(user_uuid, data)
@@ -1,9 +1,15 @@
+import time
 import strawberry
-from typing import AsyncGenerator
+from uuid import UUID
+from datetime import datetime
+from typing import AsyncGenerator, Optional
 from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from strawberry.file_uploads import Upload
 from strawberry.types import Info
 
-from src.domain.auth.permissions import IsAuthenticated
+from src.domain.auth.permissions import IsAuthenticated, IsAdmin
+from src.domain.services.password_service import run_hashing
 from src.presentation.graphql.user.input import UserInput
 from src.presentation.graphql.user.type import UserType
 
@@ -14,17 +20,8 @@ class UserQuery:
 
     @strawberry.field(permission_classes=[IsAuthenticated])
     def current_user(self, info: Info) -> UserType:
-        user = info.context.user
-        return UserType(
-            uuid=user.uuid,
-            name=user.name,
-            email=user.email,
-            role=user.role,
-            fingerprint=user.fingerprint,
-            avatar=user.avatar,
-            date=user.date,
-            status=user.status,
-        )
+        # Os campos do UserType são lidos direto do Principal
+        return info.context.user
 
 
 @strawberry.type
@@ -32,9 +29,11 @@ class UserMutation:
     """Mutation root for User"""
 
     @strawberry.mutation()
-    def create_user(self, info: Info, data: UserInput) -> bool:
+    async def create_user(self, info: Info, data: UserInput) -> bool:
         context = info.context
-        created_user = context.user_resolvers.create_user(
+        # bcrypt no executor de hash, fora do event loop
+        created_user = await run_hashing(
+            context.user_resolvers.create_user,
             name=data.name.strip(),
             email=data.email.strip(),
             password=data.password.strip(),
@@ -42,16 +41,30 @@ class UserMutation:
         return created_user
 
     @strawberry.field()
-    def auth_login(self, info: Info, email: str, password: str) -> bool:
+    async def auth_login(self, info: Info, email: str, password: str) -> bool:
         context = info.context
         request: Request = context.request
         response: Response = context.response
         user_agent = request.headers.get("user-agent")
         ip = request.headers.get("x-real-ip") or request.headers.get("x-forwarded-for")
 
-        result = context.user_resolvers.auth_login(
-            email=email.strip(), password=password.strip(), user_agent=user_agent, ip=ip
-        )
+        # Busca e bcrypt no executor de hash; sucesso e falha levam ao menos
+        # LOGIN_MIN_RESPONSE_MS, aguardados pelo router depois do commit (a
+        # vaga de admissão fica ocupada até lá)
+        started_at = time.monotonic()
+        try:
+            result = await run_hashing(
+                context.user_resolvers.auth_login,
+                email=email.strip(),
+                password=password.strip(),
+                user_agent=user_agent,
+                ip=ip,
+            )
+        finally:
+            floor = context.settings.login_min_response_ms / 1000
+            context.respond_not_before = max(
+                context.respond_not_before, started_at + floor
+            )
 
         # Definir cookies de sessão (sem max_age)
         response.set_cookie(
@@ -94,6 +107,48 @@ class UserMutation:
 
         return True
 
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
+    def logout_everywhere(self, info: Info) -> bool:
+        """Encerrar todas as sessões do usuário atual (em todos os dispositivos)"""
+        context = info.context
+        context.user_resolvers.revoke_user_tokens(context.user.uuid)
+
+        # Limpar cookies
+        context.response.delete_cookie("x-access-token")
+        context.response.delete_cookie("x-refresh-token")
+
+        return True
+
+    @strawberry.mutation(permission_classes=[IsAdmin])
+    def revoke_user_tokens(self, info: Info, user_uuid: UUID) -> bool:
+        """Encerrar todas as sessões de um usuário (admin)"""
+        return info.context.user_resolvers.revoke_user_tokens(user_uuid)
+
+    @strawberry.mutation(permission_classes=[IsAdmin])
+    def revoke_all_tokens(
+        self, info: Info, before: Optional[datetime] = None
+    ) -> datetime:
+        """Encerrar as sessões de todos os usuários criadas até `before` (admin)
+
+        Retorna o epoch em vigor (o epoch nunca recua); os demais processos
+        o aplicam em até TOKEN_EPOCH_CACHE_SECONDS.
+        """
+        return info.context.user_resolvers.revoke_all_tokens(before)
+
+    @strawberry.mutation(permission_classes=[IsAuthenticated])
+    async def upload_avatar(self, info: Info, file: Upload) -> str:
+        """Enviar o avatar do usuário atual, retorna o hash da imagem"""
+        context = info.context
+        max_bytes = context.settings.avatar_max_bytes
+
+        # Lê no máximo um byte além do limite para detectar arquivos grandes
+        data = await file.read(max_bytes + 1)
+
+        # Hash, gravação em disco e miniatura fora do event loop
+        return await run_in_threadpool(
+            context.user_resolvers.update_avatar, context.user.uuid, data
+        )
+
 
 @strawberry.type
 class UserSubscription:
@@ -1,7 +1,27 @@
 import strawberry
-from src.domain.entities.user import User
+from uuid import UUID
+from datetime import datetime
+from typing import Optional
 
 
 @strawberry.type
-class UserType(User):
-    """Tipo GraphQL para User"""
+class UserType:
+    """Tipo GraphQL para User
+
+    Resolvido a partir do Principal da requisição (leitura por atributo, sem
+    cópia). A senha nunca é exposta: o campo existe só por compatibilidade.
+    """
+
+    name: str
+    email: str
+    status: bool
+    role: str
+
+    @strawberry.field(deprecation_reason="Sempre nulo")
+    def password(self) -> Optional[str]:
+        return None
+
+    avatar: Optional[str]
+    date: Optional[datetime]
+    uuid: Optional[UUID]
+    fingerprint: Optional[int]
@@ -0,0 +1,44 @@
+"""
+Autenticação de rotas administrativas (fora do GraphQL) pelo cookie de sessão
+"""
+
+from types import SimpleNamespace
+from typing import Optional
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from src.domain.auth.permissions import IsAuthenticated
+from src.infrastructure.config.settings import Settings
+
+
+def copy_cookies(source: Response, target: Response) -> None:
+    """Repassa os Set-Cookie da resposta injetada para a resposta retornada"""
+    for name, value in source.raw_headers:
+        if name == b"set-cookie":
+            target.raw_headers.append((name, value))
+
+
+def error_response(status_code: int, detail: str, response: Response) -> Response:
+    """Erro no formato do HTTPException, com os cookies já alterados"""
+    error = JSONResponse({"detail": detail}, status_code=status_code)
+    copy_cookies(response, error)
+    return error
+
+
+def authenticate_admin(
+    request: Request, response: Response, settings: Settings
+) -> Optional[Response]:
+    """Autentica como no GraphQL (inclui a renovação do token) e exige admin
+
+    Retorna None se autorizado; senão, a resposta de erro. Ela carrega os
+    cookies renovados ou removidos na autenticação, que um HTTPException
+    descartaria.
+    """
+    context = SimpleNamespace(
+        request=request, response=response, settings=settings, user=None
+    )
+    permission = IsAuthenticated()
+    if not permission.authenticate(context):
+        return error_response(401, permission.message, response)
+    if context.user.role != "admin":
+        return error_response(403, "Admin role required", response)
+    return None
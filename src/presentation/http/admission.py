@@ -0,0 +1,228 @@
+"""
+Controle de admissão e descarte rápido de carga (load shedding) para o GraphQL
+
+Cada classe de operação tem um limite de concorrência próprio. Requisições
+acima do limite esperam numa fila e o atraso observado na fila é acompanhado
+no estilo CoDel: se ficar acima do alvo por um intervalo inteiro, o limitador
+entra em modo de descarte e responde 503 imediatamente, em vez de deixar a
+latência subir até o pool_timeout.
+"""
+
+import re
+import json
+import math
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict
+from starlette.types import ASGIApp, Receive, Scope, Send
+from src.presentation.http.graphql_request import (
+    read_body,
+    replay_receive,
+    is_json_request,
+    parse_operations,
+)
+
+# Operações caras (bcrypt, escrita de sessão, upload)
+EXPENSIVE_OPERATIONS = re.compile(r"\b(auth_login|create_user|upload_avatar)\b")
+
+
+@dataclass
+class AdmissionLimiter:
+    """Limite de concorrência com fila controlada por atraso (CoDel)"""
+
+    name: str
+    limit: int
+    target: float
+    interval: float
+    max_wait: float
+    in_flight: int = 0
+    dropping: bool = False
+    first_above_time: float = 0.0
+    service_time: float = 0.0
+    admitted: int = 0
+    shed: Dict[str, int] = field(default_factory=lambda: {"overload": 0, "timeout": 0})
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+    async def acquire(self) -> bool:
+        """Tenta obter uma vaga, retorna False se a requisição foi descartada"""
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        # Fila acima do alvo por um intervalo inteiro: descarta já
+        if self.dropping:
+            self.shed["overload"] += 1
+            return False
+
+        enqueued_at = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._give_back(waiter)
+            self.shed["timeout"] += 1
+            return False
+        except asyncio.CancelledError:
+            self._give_back(waiter)
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+        self._observe(time.monotonic() - enqueued_at)
+        self.admitted += 1
+        return True
+
+    def release(self, elapsed: float) -> None:
+        """Libera a vaga e a repassa para o próximo da fila"""
+        # Média móvel do tempo de serviço para estimar o Retry-After
+        self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+        self._hand_over()
+
+    def _give_back(self, waiter: asyncio.Future) -> None:
+        """Vaga recebida junto com o timeout ou cancelamento: repassa adiante"""
+        if waiter.done() and not waiter.cancelled():
+            self._hand_over()
+
+    def _hand_over(self) -> None:
+        """Entrega a vaga ao próximo da fila ou a devolve ao limite"""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+        self.in_flight -= 1
+
+        # Fila vazia encerra o modo de descarte
+        self.dropping = False
+        self.first_above_time = 0.0
+
+    def retry_after(self) -> int:
+        """Estimativa em segundos para a fila esvaziar"""
+        queue_delay = (len(self.waiters) + 1) * self.service_time / self.limit
+        return max(1, math.ceil(max(queue_delay, self.interval)))
+
+    def _observe(self, sojourn: float) -> None:
+        """Atualiza o estado do CoDel com o tempo que a requisição esperou"""
+        now = time.monotonic()
+
+        if sojourn < self.target:
+            self.first_above_time = 0.0
+            self.dropping = False
+        elif not self.first_above_time:
+            self.first_above_time = now + self.interval
+        elif now >= self.first_above_time:
+            self.dropping = True
+
+
+@dataclass
+class AdmissionController:
+    """Limitadores por classe de operação e métricas de descarte"""
+
+    expensive: AdmissionLimiter
+    cheap: AdmissionLimiter
+
+    def limiter_for(self, body: bytes) -> AdmissionLimiter:
+        """Classifica a requisição pelas operações presentes no corpo
+
+        Busca nos textos já decodificados do JSON (escapes como \\u005f não
+        escondem o nome); corpos inválidos contam como caros.
+        """
+        operations = parse_operations(body)
+        if operations is None:
+            return self.expensive
+
+        for operation in operations:
+            for text in (operation.get("query"), operation.get("operationName")):
+                if text and EXPENSIVE_OPERATIONS.search(text):
+                    return self.expensive
+        return self.cheap
+
+    def metrics(self) -> str:
+        """Métricas no formato texto do Prometheus"""
+        lines = [
+            "# TYPE graphql_admission_in_flight gauge",
+            "# TYPE graphql_admission_queue_length gauge",
+            "# TYPE graphql_admission_dropping gauge",
+            "# TYPE graphql_admission_admitted_total counter",
+            "# TYPE graphql_admission_shed_total counter",
+        ]
+        for limiter in (self.expensive, self.cheap):
+            label = f'class="{limiter.name}"'
+            lines += [
+                f"graphql_admission_in_flight{{{label}}} {limiter.in_flight}",
+                f"graphql_admission_queue_length{{{label}}} {len(limiter.waiters)}",
+                f"graphql_admission_dropping{{{label}}} {int(limiter.dropping)}",
+                f"graphql_admission_admitted_total{{{label}}} {limiter.admitted}",
+            ]
+            lines += [
+                f'graphql_admission_shed_total{{{label},reason="{reason}"}} {count}'
+                for reason, count in limiter.shed.items()
+            ]
+        return "\n".join(lines) + "\n"
+
+
+class AdmissionControlMiddleware:
+    """Middleware ASGI que aplica o controle de admissão em um prefixo"""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, path: str):
+        self.app = app
+        self.controller = controller
+        self.path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path):
+            await self.app(scope, receive, send)
+            return
+
+        # Uploads (multipart) não são lidos aqui e contam como caros
+        if is_json_request(scope):
+            body = await read_body(receive)
+            receive = replay_receive(body, receive)
+            limiter = self.controller.limiter_for(body)
+        elif scope["method"] == "POST":
+            limiter = self.controller.expensive
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            await self._reject(limiter, send)
+            return
+
+        started_at = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started_at)
+
+    async def _reject(self, limiter: AdmissionLimiter, send: Send) -> None:
+        body = json.dumps(
+            {
+                "data": None,
+                "errors": [
+                    {
+                        "message": "Server overloaded, retry later",
+                        "extensions": {"code": "OVERLOADED"},
+                    }
+                ],
+            }
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(limiter.retry_after()).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
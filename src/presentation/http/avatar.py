@@ -0,0 +1,123 @@
+"""
+Rota HTTP para servir avatares com ETag e requisições parciais (Range)
+"""
+
+import os
+import re
+from typing import Iterator, Optional, Tuple
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from src.domain.repositories.avatar_repository import AvatarRepository
+from src.domain.services.media_type import detect_media_type
+
+CHUNK_SIZE = 64 * 1024
+AVATAR_HASH = re.compile(r"^[0-9a-f]{64}$")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Converte o header Range em (início, fim) inclusivos
+
+    Retorna None para intervalos inválidos ou fora do arquivo. Apenas um
+    intervalo é suportado.
+    """
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # Sufixo: últimos N bytes
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Compara o If-None-Match com o ETag (comparação fraca)
+
+    Aceita listas separadas por vírgula, tags fracas (W/) e "*".
+    """
+    if not header:
+        return False
+
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def read_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Lê o arquivo em blocos no intervalo [start, end]"""
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def create_avatar_router(avatar_repository: AvatarRepository) -> APIRouter:
+    """Cria o router que serve os avatares armazenados"""
+    router = APIRouter()
+
+    @router.get("/{avatar_hash}")
+    def get_avatar(avatar_hash: str, request: Request, thumbnail: bool = False):
+        if not AVATAR_HASH.match(avatar_hash):
+            return Response(status_code=404)
+
+        path = avatar_repository.path(avatar_hash, thumbnail=thumbnail)
+        if not path:
+            return Response(status_code=404)
+
+        # O conteúdo nunca muda para o mesmo hash
+        etag = f'"{avatar_hash}{"-thumb" if thumbnail else ""}"'
+        headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "public, max-age=31536000, immutable",
+        }
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        size = os.path.getsize(path)
+        with open(path, "rb") as file:
+            media_type = detect_media_type(file.read(12)) or "application/octet-stream"
+
+        start, end, status_code = 0, size - 1, 200
+
+        # If-Range com ETag diferente ignora o Range e envia o arquivo inteiro
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or if_range == etag):
+            byte_range = parse_range(range_header, size)
+            if not byte_range:
+                return Response(
+                    status_code=416,
+                    headers={**headers, "Content-Range": f"bytes */{size}"},
+                )
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            read_file(path, start, end),
+            status_code=status_code,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    return router
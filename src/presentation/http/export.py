@@ -0,0 +1,60 @@
+"""
+Rota administrativa de exportação de usuários e sessões em streaming
+"""
+
+from datetime import datetime, timezone
+from typing import Literal, Optional
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+from src.infrastructure.config.settings import Settings
+from src.infrastructure.database.export import EXPORTS, stream_export, watermark
+from src.presentation.http.admin import (
+    authenticate_admin,
+    copy_cookies,
+    error_response,
+)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def create_export_router(settings: Settings) -> APIRouter:
+    """Cria o router de exportação (apenas usuários com role admin)"""
+    router = APIRouter()
+
+    @router.get("/export/{table}")
+    def export(
+        table: str,
+        request: Request,
+        response: Response,
+        format: Literal["ndjson", "csv"] = "ndjson",
+        since: Optional[datetime] = None,
+        gzip: bool = False,
+    ):
+        # Mesma autenticação por cookie do GraphQL (inclui a renovação do token)
+        denied = authenticate_admin(request, response, settings)
+        if denied is not None:
+            return denied
+
+        if table not in EXPORTS:
+            return error_response(404, "Unknown table", response)
+
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+        # Fim do intervalo fixado antes do streaming: vira o próximo `since`
+        until = watermark()
+        filename = f"{table}.{format}{'.gz' if gzip else ''}"
+        streaming = StreamingResponse(
+            stream_export(table, format, since, until, gzip),
+            media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "X-Export-Watermark": until.isoformat(),
+            },
+        )
+
+        # Cookie renovado durante a autenticação
+        copy_cookies(response, streaming)
+        return streaming
+
+    return router
@@ -0,0 +1,92 @@
+"""
+Utilitários para inspecionar requisições GraphQL no nível ASGI
+"""
+
+import re
+import json
+from typing import List, Optional
+from starlette.types import Message, Receive, Scope
+
+# Nome declarado (query Nome) ou, em operações anônimas, o primeiro campo
+DECLARED_NAME = re.compile(r"\b(?:query|mutation|subscription)\s+(\w+)")
+FIRST_FIELD = re.compile(r"\{\s*(\w+)")
+
+
+async def read_body(receive: Receive) -> bytes:
+    """Lê o corpo completo da requisição"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def replay_receive(body: bytes, receive: Receive) -> Receive:
+    """Cria um receive que entrega novamente o corpo já lido"""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+def is_json_request(scope: Scope) -> bool:
+    """Verifica se a requisição HTTP é um POST com corpo JSON"""
+    if scope["method"] != "POST":
+        return False
+
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            return value.startswith(b"application/json")
+    return False
+
+
+def parse_operations(body: bytes) -> Optional[List[dict]]:
+    """Operações do corpo JSON (objeto ou lote), ou None se o formato é inválido
+
+    Cada operação é um objeto cujos "query" e "operationName", quando
+    presentes, são strings.
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+
+    operations = data if isinstance(data, list) else [data]
+    for operation in operations:
+        if not isinstance(operation, dict):
+            return None
+        for key in ("query", "operationName"):
+            if not isinstance(operation.get(key, ""), (str, type(None))):
+                return None
+    return operations or None
+
+
+def operation_name(body: bytes) -> str:
+    """Nome das operações do corpo JSON (lotes são unidos com "+")"""
+    operations = parse_operations(body)
+    if operations is None:
+        return "unknown"
+
+    names = [
+        query_name(operation.get("operationName"), operation.get("query"))
+        for operation in operations
+    ]
+    return "+".join(names)
+
+
+def query_name(name: Optional[str], query: Optional[str]) -> str:
+    """Nome de uma operação: operationName, nome declarado ou primeiro campo"""
+    if not name and isinstance(query, str):
+        match = DECLARED_NAME.search(query) or FIRST_FIELD.search(query)
+        name = match.group(1) if match else None
+    return str(name or "anonymous")
@@ -0,0 +1,62 @@
+"""
+Middlewares ASGI da aplicação
+"""
+
+from uuid import uuid4
+from typing import Tuple
+from structlog.contextvars import bound_contextvars
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip que ignora rotas com conteúdo já comprimido ou parcial (Range)"""
+
+    def __init__(self, app: ASGIApp, excluded_paths: Tuple[str, ...] = (), **kwargs):
+        super().__init__(app, **kwargs)
+        self.excluded_paths = excluded_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+
+        await super().__call__(scope, receive, send)
+
+
+class RequestIdMiddleware:
+    """Associa um request_id (x-request-id do cliente ou gerado) aos logs
+
+    Middleware ASGI puro: o contexto do structlog vale para a própria task
+    da requisição e para o threadpool (que copia o contexto).
+    """
+
+    def __init__(self, app: ASGIApp, header: str = "x-request-id"):
+        self.app = app
+        self.header = header.encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = (
+            next(
+                (
+                    v.decode("latin-1")[:64]
+                    for k, v in scope["headers"]
+                    if k == self.header
+                ),
+                None,
+            )
+            or uuid4().hex
+        )
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[self.header.decode()] = request_id
+            await send(message)
+
+        with bound_contextvars(request_id=request_id):
+            await self.app(scope, receive, send_with_request_id)
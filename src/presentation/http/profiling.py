@@ -0,0 +1,184 @@
+"""
+Profiler por amostragem (pyinstrument) para investigar requisições lentas
+
+Opcional: exige o pyinstrument instalado e nunca é ativado em produção. Os
+perfis são gravados em arquivos speedscope (https://www.speedscope.app) ou
+HTML (flamegraph interativo) nomeados com a operação GraphQL.
+"""
+
+import re
+import os
+import random
+import asyncio
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+from src.infrastructure.config.settings import Settings
+from src.presentation.http.admin import (
+    authenticate_admin,
+    copy_cookies,
+    error_response,
+)
+from src.presentation.http.graphql_request import (
+    read_body,
+    replay_receive,
+    is_json_request,
+    operation_name,
+)
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+except ImportError:  # pragma: no cover - dependência opcional
+    Profiler = None
+
+# Extensão e content-type de cada formato de saída
+FORMATS = {
+    "speedscope": ("speedscope.json", "application/json"),
+    "html": ("html", "text/html"),
+}
+
+
+@dataclass
+class SamplingProfiler:
+    """Inicia perfis e grava o resultado no formato configurado"""
+
+    output_dir: str
+    format: str = "speedscope"
+    interval: float = 0.001
+    active: bool = False
+
+    def __post_init__(self):
+        if Profiler is None:
+            raise RuntimeError("PROFILING_ENABLED exige o pacote pyinstrument")
+        if self.format not in FORMATS:
+            raise ValueError(f"PROFILING_FORMAT inválido: {self.format}")
+
+    def start(self, async_mode: str = "enabled") -> Optional["Profiler"]:
+        """Inicia um perfil, ou None se outro já está rodando no event loop"""
+        if self.active:
+            return None
+        self.active = True
+        profiler = Profiler(interval=self.interval, async_mode=async_mode)
+        profiler.start()
+        return profiler
+
+    def stop(self, profiler: "Profiler") -> str:
+        """Encerra o perfil e retorna o conteúdo renderizado"""
+        profiler.stop()
+        self.active = False
+        renderer = (
+            SpeedscopeRenderer() if self.format == "speedscope" else HTMLRenderer()
+        )
+        return profiler.output(renderer=renderer)
+
+    def save(self, content: str, name: str) -> str:
+        """Grava o perfil em output_dir e retorna o caminho do arquivo"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        extension = FORMATS[self.format][0]
+        safe_name = re.sub(r"[^\w+-]", "_", name)[:100]
+        timestamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        path = os.path.join(self.output_dir, f"{timestamp}-{safe_name}.{extension}")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+
+class ProfilingMiddleware:
+    """Perfila requisições com o header de ativação ou por amostragem"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profiler: SamplingProfiler,
+        path: str,
+        sample_rate: float = 0.0,
+        header: bytes = b"x-profile",
+    ):
+        self.app = app
+        self.profiler = profiler
+        self.path = path
+        self.sample_rate = sample_rate
+        self.header = header
+
+    def _wants_profile(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return value not in (b"", b"0", b"false")
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(self.path)
+            or not self._wants_profile(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # O nome da operação identifica o arquivo gerado
+        if is_json_request(scope):
+            body = await read_body(receive)
+            receive = replay_receive(body, receive)
+            name = operation_name(body)
+        else:
+            name = scope["method"].lower()
+
+        profiler = self.profiler.start()
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            content = self.profiler.stop(profiler)
+            await run_in_threadpool(self.profiler.save, content, name)
+
+
+def create_profiling_router(
+    profiler: SamplingProfiler, max_seconds: int, settings: Settings
+) -> APIRouter:
+    """Cria a rota de amostragem contínua por tempo limitado (role admin)"""
+    router = APIRouter()
+
+    @router.get("/profile")
+    async def profile(
+        request: Request, response: Response, seconds: float = Query(5, gt=0)
+    ):
+        # O perfil expõe código e dados de todas as requisições em andamento
+        denied = await run_in_threadpool(
+            authenticate_admin, request, response, settings
+        )
+        if denied is not None:
+            return denied
+
+        if seconds > max_seconds:
+            return error_response(400, f"Máximo de {max_seconds} segundos", response)
+
+        # Sem contexto async: amostra tudo que roda na thread do event loop
+        running = profiler.start(async_mode="disabled")
+        if running is None:
+            return error_response(409, "Já existe um perfil em andamento", response)
+
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            content = profiler.stop(running)
+
+        path = await run_in_threadpool(profiler.save, content, "continuous")
+        result = Response(
+            content,
+            media_type=FORMATS[profiler.format][1],
+            headers={"x-profile-path": path},
+        )
+
+        # Cookie renovado durante a autenticação
+        copy_cookies(response, result)
+        return result
+
+    return router
@@ -0,0 +1,135 @@
+"""
+Configuração dos testes: banco SQLite temporário
+
+As variáveis de ambiente são definidas antes de qualquer import de `src`
+(feito dentro das fixtures), porque as engines são criadas na importação
+dos módulos.
+"""
+
+import os
+import jwt
+import uuid
+import tempfile
+import pytest
+from sqlalchemy import update
+from fastapi.testclient import TestClient
+
+_database_dir = tempfile.mkdtemp(prefix="auth-tests-")
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_database_dir}/app.db",
+    DATABASE_READ_URL="",
+    SHARDS="",
+    DEBUG="false",
+    JWT_SECRET_KEY="test-secret-key-with-at-least-32-bytes!!",
+    SALT="test-salt",
+    ACCESS_TOKEN_EXPIRES_MINUTES="15",
+    REFRESH_TOKEN_EXPIRES_DAYS="7",
+    HOST="127.0.0.1",
+    PORT="8000",
+    RELOAD="false",
+    PRODUCTION="false",
+    SESSION_POLICY="unlimited",
+    LOGIN_MIN_RESPONSE_MS="0",
+    LOG_LEVEL="WARNING",
+    AVATAR_STORAGE_PATH=f"{_database_dir}/avatars",
+)
+
+# TrustedHostMiddleware aceita apenas localhost
+BASE_URL = "http://localhost"
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Aplicação com o ciclo de vida (tabelas, write-behind) ativo"""
+    import main
+
+    with TestClient(main.app, base_url=BASE_URL):
+        yield main.app
+
+
+@pytest.fixture
+def graphql():
+    """Executa uma operação e retorna (data, [(mensagem, código)])"""
+
+    def execute(client: TestClient, query: str, variables: dict = None):
+        body = client.post(
+            "/graphql", json={"query": query, "variables": variables or {}}
+        ).json()
+        errors = [
+            (error["message"], (error.get("extensions") or {}).get("code"))
+            for error in body.get("errors") or []
+        ]
+        return body.get("data"), errors
+
+    return execute
+
+
+@pytest.fixture
+def create_user(app, graphql):
+    """Cria um usuário com e-mail único e retorna (e-mail, uuid)"""
+    from src.infrastructure.database.models import users
+    from src.infrastructure.database.session import engine
+
+    def create(role: str = "user", password: str = "secret"):
+        email = f"{uuid.uuid4().hex[:12]}@example.com"
+        client = TestClient(app, base_url=BASE_URL)
+        data, errors = graphql(
+            client,
+            "mutation ($data: UserInput!) { create_user(data: $data) }",
+            {"data": {"name": "Test", "email": email, "password": password}},
+        )
+        assert data == {"create_user": True}, errors
+
+        with engine.begin() as conn:
+            user_uuid = conn.execute(
+                update(users)
+                .where(users.c.email_normalized == email)
+                .values(role=role)
+                .returning(users.c.uuid)
+            ).scalar_one()
+        return email, user_uuid
+
+    return create
+
+
+@pytest.fixture
+def login(app, graphql):
+    """Cliente com os cookies de uma nova sessão do usuário"""
+
+    def authenticate(email: str, password: str = "secret") -> TestClient:
+        client = TestClient(app, base_url=BASE_URL)
+        data, errors = graphql(
+            client,
+            "mutation ($email: String!, $password: String!) "
+            "{ auth_login(email: $email, password: $password) }",
+            {"email": email, "password": password},
+        )
+        assert data == {"auth_login": True}, errors
+        return client
+
+    return authenticate
+
+
+@pytest.fixture
+def reencode():
+    """Troca claims do access token de um cliente (mesma sessão no banco)
+
+    Claims com valor None são removidos (tokens legados).
+    """
+    key = os.environ["JWT_SECRET_KEY"]
+
+    def change(client: TestClient, **claims) -> None:
+        payload = jwt.decode(
+            client.cookies["x-access-token"],
+            key,
+            algorithms=["HS256"],
+            options={"verify_exp": False},
+        )
+        payload.update(claims)
+        payload = {name: value for name, value in payload.items() if value is not None}
+        # Substitui o cookie da resposta (mesmo domínio) em vez de duplicá-lo
+        client.cookies.delete("x-access-token")
+        client.cookies.set("x-access-token", jwt.encode(payload, key, "HS256"))
+
+    return change
@@ -0,0 +1,127 @@
+"""
+Controle de admissão: a vaga repassada a quem desistiu volta para a fila e
+a classificação das operações pelo JSON decodificado
+"""
+
+import json
+import asyncio
+import pytest
+from src.presentation.http import admission
+from src.presentation.http.admission import AdmissionController, AdmissionLimiter
+
+
+def _limiter(max_wait: float = 1.0) -> AdmissionLimiter:
+    return AdmissionLimiter(
+        name="test", limit=1, target=1.0, interval=1.0, max_wait=max_wait
+    )
+
+
+def test_timeout_without_slot_is_shed():
+    async def scenario():
+        limiter = _limiter(max_wait=0.01)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert limiter.shed["timeout"] == 1
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.parametrize("error", [asyncio.TimeoutError, asyncio.CancelledError])
+def test_waiter_giving_up_passes_slot_on(monkeypatch, error):
+    limiter = _limiter()
+
+    async def wait_for_racing_release(waiter, timeout):
+        # A vaga chega no mesmo instante do timeout (ou do cancelamento)
+        limiter.release(0.0)
+        raise error
+
+    async def scenario():
+        assert await limiter.acquire()
+        with monkeypatch.context() as patch:
+            patch.setattr(admission.asyncio, "wait_for", wait_for_racing_release)
+            try:
+                assert not await limiter.acquire()
+            except asyncio.CancelledError:
+                assert error is asyncio.CancelledError
+
+        # A vaga não vazou: o próximo entra sem fila
+        assert limiter.in_flight == 0
+        assert await limiter.acquire()
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 1
+    assert not limiter.waiters
+
+
+def test_slot_passes_to_next_waiter():
+    async def scenario():
+        limiter = _limiter()
+        assert await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        limiter.release(0.0)
+        assert await waiting
+        assert limiter.in_flight == 1
+        assert limiter.admitted == 2
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    "body, expensive",
+    [
+        (json.dumps({"query": "{ current_user { email } }"}), False),
+        (json.dumps({"query": 'mutation { auth_login(email: "") }'}), True),
+        # O escape JSON de "_" não esconde a operação cara
+        ('{"query": "mutation { auth\\u005flogin(email: \\"\\") }"}', True),
+        (
+            json.dumps(
+                [{"query": "{ current_user { email } }"}, {"query": "{ create_user }"}]
+            ),
+            True,
+        ),
+        (json.dumps({"query": "{ a }", "operationName": "upload_avatar"}), True),
+        # Corpo inválido ou fora do formato esperado
+        ("{not json", True),
+        (json.dumps({"query": ["auth_login"]}), True),
+        (json.dumps(["{ current_user { email } }"]), True),
+        (json.dumps([]), True),
+    ],
+)
+def test_limiter_for_decoded_operations(body, expensive):
+    controller = AdmissionController(expensive=_limiter(), cheap=_limiter())
+    limiter = controller.limiter_for(body.encode())
+    assert (limiter is controller.expensive) is expensive
+
+
+def test_escaped_operation_counts_as_expensive(app, create_user):
+    from fastapi.testclient import TestClient
+
+    email, _ = create_user()
+    client = TestClient(app, base_url="http://localhost")
+
+    def admitted() -> dict:
+        lines = client.get("/metrics").text.splitlines()
+        return {
+            name: int(line.split()[-1])
+            for line in lines
+            for name in ("expensive", "cheap")
+            if line.startswith(f'graphql_admission_admitted_total{{class="{name}"}}')
+        }
+
+    before = admitted()
+    body = (
+        '{"query": "mutation { auth\\u005flogin(email: \\"%s\\", '
+        'password: \\"secret\\") }"}' % email
+    )
+    response = client.post(
+        "/graphql", content=body, headers={"content-type": "application/json"}
+    )
+    assert response.json() == {"data": {"auth_login": True}}
+
+    after = admitted()
+    assert after["expensive"] == before["expensive"] + 1
+    assert after["cheap"] == before["cheap"]
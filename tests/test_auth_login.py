@@ -0,0 +1,100 @@
+"""
+Login: bcrypt fora dos blocos de sessão e custo uniforme
+"""
+
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src.domain.services import password_service
+from src.infrastructure.database import session as database_session
+from src.infrastructure.database.repositories import user_repository
+from src.infrastructure.database.session import engine, primary_read_engine
+from src.presentation.graphql import router
+
+LOGIN = (
+    "mutation ($email: String!, $password: String!) "
+    "{ auth_login(email: $email, password: $password) }"
+)
+
+
+@pytest.fixture
+def verifications(monkeypatch):
+    """Registra (hash recebido, conexões retidas) de cada verify_password"""
+    calls = []
+
+    def verify_password(password, password_hash):
+        checked_out = engine.pool.checkedout() + primary_read_engine.pool.checkedout()
+        calls.append((password_hash, checked_out))
+        return password_service.verify_password(password, password_hash)
+
+    monkeypatch.setattr(user_repository, "verify_password", verify_password)
+    return calls
+
+
+def test_password_verified_without_holding_connections(
+    create_user, login, verifications
+):
+    email, _ = create_user()
+    login(email)
+
+    ((password_hash, checked_out),) = verifications
+    assert password_hash is not None
+    assert checked_out == 0
+
+
+@pytest.mark.parametrize("known_email", [True, False])
+def test_failed_login_pays_one_bcrypt(
+    app, create_user, graphql, verifications, known_email
+):
+    email, _ = create_user()
+    email = email if known_email else f"unknown-{email}"
+
+    data, errors = graphql(
+        TestClient(app, base_url="http://localhost"),
+        LOGIN,
+        {"email": email, "password": "wrong"},
+    )
+    assert data is None
+    assert [message for message, _ in errors] == ["E-mail ou senha incorretos"]
+
+    ((password_hash, checked_out),) = verifications
+    assert (password_hash is not None) is known_email
+    assert checked_out == 0
+
+
+@pytest.fixture
+def floor_client(app, monkeypatch):
+    """Cliente de uma aplicação com LOGIN_MIN_RESPONSE_MS de 200 ms"""
+    import main
+
+    monkeypatch.setenv("LOGIN_MIN_RESPONSE_MS", "200")
+    # Banco e tarefas de fundo já iniciados pela aplicação da sessão de testes
+    return TestClient(main.create_app(), base_url="http://localhost")
+
+
+def test_response_floor_waits_after_commit(
+    floor_client, create_user, graphql, monkeypatch
+):
+    email, _ = create_user()
+    # Fora do SQLite as escritas só são confirmadas no fim da requisição
+    monkeypatch.setattr(database_session, "SINGLE_WRITER", False)
+
+    sleeps = []
+    sleep = router.asyncio.sleep
+
+    async def record_sleep(delay):
+        checked_out = engine.pool.checkedout() + primary_read_engine.pool.checkedout()
+        sleeps.append((delay, checked_out))
+        await sleep(delay)
+
+    monkeypatch.setattr(router.asyncio, "sleep", record_sleep)
+
+    started_at = time.monotonic()
+    data, errors = graphql(floor_client, LOGIN, {"email": email, "password": "secret"})
+    assert data == {"auth_login": True}, errors
+    assert time.monotonic() - started_at >= 0.2
+
+    # O piso é aguardado sem conexão (e sem os locks da sessão criada)
+    ((delay, checked_out),) = sleeps
+    assert 0 < delay <= 0.2
+    assert checked_out == 0
@@ -0,0 +1,64 @@
+"""
+Rota de avatares: ETag, If-None-Match e tipo da imagem
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from src.domain.services.media_type import detect_media_type
+from src.infrastructure.config.settings import get_settings
+from src.infrastructure.storage.avatar_repository import LocalAvatarRepository
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+
+
+@pytest.fixture
+def avatar(app):
+    """Hash de um avatar gravado e o cliente HTTP"""
+    repository = LocalAvatarRepository(root=get_settings().avatar_storage_path)
+    return repository.save(PNG), TestClient(app, base_url="http://localhost")
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        '"{hash}"',
+        'W/"{hash}"',
+        '"other", "{hash}"',
+        '"other",W/"{hash}"',
+        "*",
+    ],
+)
+def test_if_none_match_returns_not_modified(avatar, header):
+    avatar_hash, client = avatar
+    response = client.get(
+        f"/avatars/{avatar_hash}",
+        headers={"If-None-Match": header.format(hash=avatar_hash)},
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == f'"{avatar_hash}"'
+
+
+@pytest.mark.parametrize("header", ['"other"', 'W/"other", "x"', '"{hash}-thumb"'])
+def test_if_none_match_other_tags_return_content(avatar, header):
+    avatar_hash, client = avatar
+    response = client.get(
+        f"/avatars/{avatar_hash}",
+        headers={"If-None-Match": header.format(hash=avatar_hash)},
+    )
+    assert response.status_code == 200
+    assert response.content == PNG
+    assert response.headers["content-type"] == "image/png"
+
+
+@pytest.mark.parametrize(
+    "header, media_type",
+    [
+        (PNG[:12], "image/png"),
+        (b"\xff\xd8\xff\xe0" + b"\x00" * 8, "image/jpeg"),
+        (b"GIF89a" + b"\x00" * 6, "image/gif"),
+        (b"RIFF\x00\x00\x00\x00WEBP", "image/webp"),
+        (b"%PDF-1.7", None),
+    ],
+)
+def test_detect_media_type(header, media_type):
+    assert detect_media_type(header) == media_type
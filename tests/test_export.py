@@ -0,0 +1,76 @@
+"""
+Exportação administrativa: marca d'água com margem e cookies nas respostas de erro
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+# Access token expirado: a autenticação renova o cookie
+EXPIRED = datetime.now(timezone.utc) - timedelta(minutes=5)
+
+
+def _exported_emails(response) -> set:
+    return {json.loads(line)["email"] for line in response.text.splitlines()}
+
+
+def _set_cookies(response) -> list:
+    return response.headers.get_list("set-cookie")
+
+
+def test_watermark_lags_behind_now(create_user, login, monkeypatch):
+    monkeypatch.setenv("EXPORT_WATERMARK_LAG_SECONDS", "3600")
+    admin_email, _ = create_user(role="admin")
+    admin = login(admin_email)
+
+    response = admin.get("/admin/export/users")
+    assert response.status_code == 200
+
+    watermark = datetime.fromisoformat(response.headers["x-export-watermark"])
+    lag = datetime.now(timezone.utc) - watermark
+    assert timedelta(minutes=59) < lag <= timedelta(hours=1, seconds=5)
+
+    # Criado dentro da margem: fica para a próxima exportação incremental
+    assert admin_email not in _exported_emails(response)
+
+    monkeypatch.setenv("EXPORT_WATERMARK_LAG_SECONDS", "0")
+    response = admin.get("/admin/export/users", params={"since": watermark.isoformat()})
+    assert admin_email in _exported_emails(response)
+
+
+def test_forbidden_keeps_refreshed_cookie(create_user, login, reencode):
+    email, _ = create_user()
+    client = login(email)
+    reencode(client, exp=EXPIRED)
+
+    response = client.get("/admin/export/users")
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Admin role required"}
+    assert any(
+        cookie.startswith("x-access-token=") for cookie in _set_cookies(response)
+    )
+
+
+def test_unauthorized_clears_cookies(create_user, login, graphql, reencode):
+    email, _ = create_user(role="admin")
+    client = login(email)
+    graphql(login(email), "mutation { logout_everywhere }")
+
+    # A renovação falha (sessão revogada) e a autenticação remove os cookies
+    reencode(client, exp=EXPIRED)
+
+    response = client.get("/admin/export/users")
+    assert response.status_code == 401
+    cleared = {cookie.split("=")[0] for cookie in _set_cookies(response)}
+    assert cleared == {"x-access-token", "x-refresh-token"}
+
+
+def test_unknown_table_keeps_refreshed_cookie(create_user, login, reencode):
+    email, _ = create_user(role="admin")
+    client = login(email)
+    reencode(client, exp=EXPIRED)
+
+    response = client.get("/admin/export/passwords")
+    assert response.status_code == 404
+    assert any(
+        cookie.startswith("x-access-token=") for cookie in _set_cookies(response)
+    )
@@ -0,0 +1,144 @@
+"""
+Migrações em bancos SQLite temporários com o schema antigo
+"""
+
+import uuid
+import hashlib
+import pytest
+from sqlalchemy import inspect, text
+from src.infrastructure.database import migrations
+from src.infrastructure.database.models import metadata
+from src.infrastructure.database.session import create_database_engine
+
+
+@pytest.fixture
+def old_database(tmp_path, monkeypatch):
+    """Banco vazio no lugar do primário das migrações"""
+    database_engine = create_database_engine(f"sqlite:///{tmp_path}/old.db")
+    monkeypatch.setattr(migrations, "engine", database_engine)
+    yield database_engine
+    database_engine.dispose()
+
+
+def test_session_hashes_rebuild_keeps_existing_columns(old_database):
+    # Schema anterior às colunas de atividade, com hashes em hex
+    metadata.tables["users"].create(bind=old_database)
+    session_uuid, user_uuid = uuid.uuid4(), uuid.uuid4()
+    access, refresh = hashlib.sha256(b"a").digest(), hashlib.sha256(b"r").digest()
+    with old_database.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE sessions (uuid CHAR(32) PRIMARY KEY, "
+                "access_token TEXT NOT NULL, refresh_token TEXT NOT NULL, "
+                "access_token_expires_at DATETIME NOT NULL, "
+                "refresh_token_expires_at DATETIME NOT NULL, user_agent TEXT, "
+                "ip VARCHAR(255), revoked BOOLEAN, user_uuid CHAR(32) NOT NULL, "
+                "type VARCHAR NOT NULL, date DATETIME)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO sessions VALUES (:uuid, :access, :refresh, "
+                "'2030-01-01 00:00:00', '2030-01-01 00:00:00', 'agent', "
+                "'127.0.0.1', 0, :user_uuid, 'manual', '2025-01-01 00:00:00')"
+            ),
+            {
+                "uuid": session_uuid.hex,
+                "access": access.hex(),
+                "refresh": refresh.hex(),
+                "user_uuid": user_uuid.hex,
+            },
+        )
+
+    migrations.session_hashes_to_binary()
+
+    with old_database.connect() as conn:
+        row = conn.execute(text("SELECT * FROM sessions")).mappings().one()
+    assert (row["access_token"], row["refresh_token"]) == (access, refresh)
+    assert (row["user_agent"], row["ip"]) == ("agent", "127.0.0.1")
+    assert (row["last_seen_at"], row["request_count"]) == (None, 0)
+    assert "sessions_hex" not in inspect(old_database).get_table_names()
+
+    # Já convertida: rodar de novo não faz nada
+    migrations.session_hashes_to_binary()
+
+
+def test_sessions_active_index_matches_model(old_database):
+    metadata.tables["users"].create(bind=old_database)
+    metadata.tables["sessions"].create(bind=old_database)
+    with old_database.begin() as conn:
+        conn.execute(text("DROP INDEX ix_sessions_user_uuid_date_active"))
+
+    migrations.sessions_active_index()
+    migrations.sessions_active_index()
+
+    with old_database.connect() as conn:
+        plan = conn.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT uuid FROM sessions "
+                "WHERE user_uuid = :user_uuid AND revoked IS 0 ORDER BY date DESC"
+            ),
+            {"user_uuid": uuid.uuid4().hex},
+        ).all()
+    assert "ix_sessions_user_uuid_date_active" in " ".join(row[-1] for row in plan)
+
+
+def test_email_conflicts_reported_before_backfill(old_database, capsys):
+    # Estado entre prepare e finalize: índice único criado, contas da versão
+    # antiga ainda sem e-mail normalizado
+    with old_database.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE users (uuid CHAR(32) PRIMARY KEY, "
+                "email VARCHAR NOT NULL UNIQUE, email_normalized VARCHAR)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE UNIQUE INDEX uq_users_email_normalized "
+                "ON users (email_normalized)"
+            )
+        )
+        for email, normalized in [
+            ("alice@example.com", "alice@example.com"),
+            ("Alice@Example.com", None),
+            ("BOB@example.com", None),
+            ("bob@example.com", None),
+            ("carol@example.com", None),
+        ]:
+            conn.execute(
+                text("INSERT INTO users VALUES (:uuid, :email, :normalized)"),
+                {"uuid": uuid.uuid4().hex, "email": email, "normalized": normalized},
+            )
+
+    migrations.users_email_normalized("finalize")
+
+    output = capsys.readouterr().out
+    assert (
+        "e-mail duplicado: alice@example.com "
+        "(alice@example.com, Alice@Example.com)" in output
+    )
+    assert (
+        "e-mail duplicado: bob@example.com (BOB@example.com, bob@example.com)" in output
+    )
+
+    def pending() -> set:
+        with old_database.connect() as conn:
+            return set(
+                conn.execute(
+                    text("SELECT email FROM users WHERE email_normalized IS NULL")
+                ).scalars()
+            )
+
+    # Nada preenchido enquanto houver duplicatas
+    assert "carol@example.com" in pending()
+
+    with old_database.begin() as conn:
+        conn.execute(
+            text(
+                "DELETE FROM users "
+                "WHERE email IN ('Alice@Example.com', 'BOB@example.com')"
+            )
+        )
+    migrations.users_email_normalized("finalize")
+    assert pending() == set()
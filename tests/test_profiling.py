@@ -0,0 +1,52 @@
+"""
+Rota de amostragem contínua: apenas administradores
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.infrastructure.config.settings import get_settings
+from src.presentation.http.profiling import SamplingProfiler, create_profiling_router
+
+pytest.importorskip("pyinstrument")
+
+
+@pytest.fixture
+def profiling_client(app, tmp_path):
+    """Cliente de uma aplicação só com a rota /debug/profile"""
+    profiler = SamplingProfiler(output_dir=str(tmp_path))
+    debug = FastAPI()
+    debug.include_router(
+        create_profiling_router(profiler, 1, get_settings()), prefix="/debug"
+    )
+
+    def client(cookies=None) -> TestClient:
+        return TestClient(debug, base_url="http://localhost", cookies=cookies)
+
+    return client
+
+
+def test_anonymous_is_unauthorized(profiling_client):
+    response = profiling_client().get("/debug/profile", params={"seconds": 0.01})
+    assert response.status_code == 401
+
+
+def test_regular_user_is_forbidden(profiling_client, create_user, login):
+    email, _ = create_user()
+    client = profiling_client(login(email).cookies)
+
+    response = client.get("/debug/profile", params={"seconds": 0.01})
+    assert response.status_code == 403
+    assert response.json() == {"detail": "Admin role required"}
+
+
+def test_admin_receives_profile(profiling_client, create_user, login):
+    email, _ = create_user(role="admin")
+    client = profiling_client(login(email).cookies)
+
+    response = client.get("/debug/profile", params={"seconds": 0.01})
+    assert response.status_code == 200
+    assert response.headers["x-profile-path"].endswith(".speedscope.json")
+
+    response = client.get("/debug/profile", params={"seconds": 2})
+    assert response.status_code == 400
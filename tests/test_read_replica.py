@@ -0,0 +1,103 @@
+"""
+Primário e réplica em dois bancos SQLite: schema e read-your-writes
+
+A replicação é simulada copiando o arquivo do primário para o da réplica.
+"""
+
+import sqlite3
+import pytest
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import inspect
+from src.infrastructure.database import session as database_session
+from src.infrastructure.database.session import engine, create_database_engine
+from src.domain.services.token_service import TokenService
+from src.domain.auth.permissions import authenticate_connection
+from src.infrastructure.config.settings import get_settings
+
+CURRENT_USER = "query { current_user { email } }"
+
+
+@pytest.fixture
+def replica(app, tmp_path, monkeypatch):
+    """Réplica em outro arquivo; retorna a função que replica o primário"""
+    url = f"sqlite:///{tmp_path}/replica.db"
+    replica_engine = create_database_engine(url, reader=True)
+    monkeypatch.setattr(database_session, "read_engine", replica_engine)
+    monkeypatch.setattr(database_session, "get_database_read_url", lambda: url)
+
+    def replicate() -> None:
+        replica_engine.dispose()
+        source = sqlite3.connect(engine.url.database)
+        target = sqlite3.connect(f"{tmp_path}/replica.db")
+        with source, target:
+            source.backup(target)
+        source.close()
+        target.close()
+
+    replicate.engine = replica_engine
+    yield replicate
+    replica_engine.dispose()
+
+
+def test_create_tables_leaves_replica_schema_alone(replica):
+    database_session.create_tables()
+
+    # O schema da réplica vem da replicação, nunca de um create_all local
+    assert inspect(replica.engine).get_table_names() == []
+
+
+def test_recent_session_reads_from_primary(
+    replica, create_user, login, graphql, reencode
+):
+    replica()
+    email, _ = create_user()
+    client = login(email)
+
+    # Sessão recém-emitida: lida no primário, ainda ausente na réplica
+    assert graphql(client, CURRENT_USER)[0] == {"current_user": {"email": email}}
+
+    # Fora da janela de read-your-writes a leitura vai para a réplica
+    reencode(client, iat=datetime.now(timezone.utc) - timedelta(minutes=1))
+    data, errors = graphql(client, CURRENT_USER)
+    assert data is None
+    assert errors == [("User not found or session invalid", "UNAUTHORIZED")]
+
+    replica()
+    assert graphql(client, CURRENT_USER)[0] == {"current_user": {"email": email}}
+
+
+def test_is_recently_issued_uses_iat():
+    service = TokenService("key", "salt", 15, 7)
+    now = datetime.now(timezone.utc)
+    exp = (now + timedelta(minutes=15)).timestamp()
+
+    assert service.is_recently_issued({"iat": now.timestamp(), "exp": exp}, 5)
+    old = (now - timedelta(seconds=30)).timestamp()
+    assert not service.is_recently_issued({"iat": old, "exp": exp}, 5)
+
+    # Tokens sem iat: emissão estimada pela expiração e a duração configurada
+    assert service.is_recently_issued({"exp": exp}, 5)
+    assert not service.is_recently_issued({"exp": exp - 60}, 5)
+
+
+def test_websocket_authentication_reads_recent_sessions_from_primary(
+    replica, create_user, login, reencode
+):
+    replica()
+    email, _ = create_user()
+    client = login(email)
+
+    def connect():
+        context = SimpleNamespace(
+            settings=get_settings(),
+            request=SimpleNamespace(cookies=dict(client.cookies)),
+        )
+        authenticate_connection(context)
+        return context
+
+    assert connect().user.email == email
+
+    reencode(client, iat=datetime.now(timezone.utc) - timedelta(minutes=1))
+    with pytest.raises(ValueError, match="session invalid"):
+        connect()
@@ -0,0 +1,177 @@
+"""
+Teste diferencial do codec HS256 contra o PyJWT
+
+Os tokens do codec precisam ser idênticos byte a byte aos do PyJWT, e cada
+lado precisa aceitar (ou rejeitar, com a mesma exceção) os tokens do outro.
+"""
+
+import time
+import base64
+import pytest
+import jwt
+from datetime import datetime, timedelta, timezone
+from src.domain.services.token_codec import HS256TokenCodec
+from src.domain.services.token_service import TokenService
+
+KEY = "test-secret-key-with-at-least-32-bytes!!"
+OTHER_KEY = "another-secret-key-with-32-bytes-or-more"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+PAYLOADS = [
+    {
+        "uuid": "5f0c7a1e-0000-4000-8000-000000000001",
+        "access_token": "a" * 64,
+        "type": "access",
+        "exp": _now() + timedelta(minutes=15),
+    },
+    {
+        "uuid": "5f0c7a1e-0000-4000-8000-000000000002",
+        "refresh_token": "b" * 64,
+        "type": "refresh",
+        "exp": int(time.time()) + 3600,
+        "iat": _now(),
+        "auth_time": time.time(),
+    },
+    {
+        "uuid": "5f0c7a1e-0000-4000-8000-000000000003",
+        "access_token": "ç" * 8,
+        "type": "access",
+        "exp": _now() + timedelta(days=7),
+        "iat": int(time.time()) - 10,
+        "auth_time": 0,
+    },
+]
+
+
+@pytest.fixture
+def codec() -> HS256TokenCodec:
+    return HS256TokenCodec(KEY)
+
+
+def _pyjwt_decode(token: str, key: str = KEY, **options) -> dict:
+    return jwt.decode(token, key, algorithms=["HS256"], options=options)
+
+
+def _tamper(token: str) -> str:
+    header, payload, signature = token.split(".")
+    claims = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+    forged = base64.urlsafe_b64encode(claims.replace(b"5f0c7a1e", b"6f0c7a1e"))
+    return ".".join([header, forged.rstrip(b"=").decode(), signature])
+
+
+def _raised(decode, token: str):
+    try:
+        decode(token)
+    except jwt.PyJWTError as e:
+        return type(e)
+    return None
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_encode_identical_to_pyjwt(codec, payload):
+    assert codec.encode(payload) == jwt.encode(payload, KEY, algorithm="HS256")
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_cross_decode(codec, payload):
+    codec_token = codec.encode(payload)
+    pyjwt_token = jwt.encode(payload, KEY, algorithm="HS256")
+
+    assert codec.decode(pyjwt_token) == _pyjwt_decode(codec_token)
+    assert codec.decode(codec_token) == _pyjwt_decode(pyjwt_token)
+
+
+def test_expired_token(codec):
+    payload = {**PAYLOADS[0], "exp": _now() - timedelta(seconds=1)}
+    token = codec.encode(payload)
+
+    assert _raised(codec.decode, token) is jwt.ExpiredSignatureError
+    assert _raised(_pyjwt_decode, token) is jwt.ExpiredSignatureError
+
+    # verify_exp=False aceita o token expirado nos dois lados
+    assert codec.decode(token, verify_exp=False) == _pyjwt_decode(
+        token, verify_exp=False
+    )
+
+
+def test_future_iat_rejected_by_both(codec):
+    token = codec.encode({**PAYLOADS[0], "iat": int(time.time()) + 3600})
+
+    assert _raised(codec.decode, token) is jwt.ImmatureSignatureError
+    assert _raised(_pyjwt_decode, token) is jwt.ImmatureSignatureError
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_tampered_token(codec, payload):
+    token = _tamper(codec.encode(payload))
+
+    assert _raised(codec.decode, token) is jwt.InvalidSignatureError
+    assert _raised(_pyjwt_decode, token) is jwt.InvalidSignatureError
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_wrong_key(codec, payload):
+    token = jwt.encode(payload, OTHER_KEY, algorithm="HS256")
+
+    assert _raised(codec.decode, token) is jwt.InvalidSignatureError
+    assert _raised(_pyjwt_decode, token) is jwt.InvalidSignatureError
+
+
+@pytest.mark.parametrize(
+    "token",
+    ["", "abc", "a.b", "a.b.c", "ey.ey.ey"],
+)
+def test_malformed_token(codec, token):
+    codec_error = _raised(codec.decode, token)
+    assert codec_error is not None or codec.decode(token) is None
+    assert _raised(_pyjwt_decode, token) is not None
+
+
+def test_non_canonical_header_falls_back(codec):
+    token = jwt.encode(PAYLOADS[0], KEY, algorithm="HS256", headers={"kid": "1"})
+
+    # Fora do layout fixo: o codec não trata, o PyJWT decodifica
+    assert codec.decode(token) is None
+    assert _pyjwt_decode(token)["uuid"] == PAYLOADS[0]["uuid"]
+
+
+def test_extra_claim_falls_back(codec):
+    token = jwt.encode({**PAYLOADS[0], "admin": True}, KEY, algorithm="HS256")
+
+    assert codec.decode(token) is None
+    assert _pyjwt_decode(token)["admin"] is True
+
+
+def test_non_integer_time_claim_falls_back(codec):
+    token = jwt.encode({**PAYLOADS[0], "exp": time.time() + 60}, KEY, "HS256")
+
+    assert codec.decode(token) is None
+    assert _pyjwt_decode(token)["uuid"] == PAYLOADS[0]["uuid"]
+
+
+def _token_service(fast_codec: bool) -> TokenService:
+    return TokenService(KEY, "salt", 15, 7, fast_codec=fast_codec)
+
+
+@pytest.mark.parametrize("fast_codec", [True, False])
+def test_token_service_pyjwt_fallback(fast_codec):
+    service = _token_service(fast_codec)
+    extra = jwt.encode({**PAYLOADS[0], "admin": True}, KEY, algorithm="HS256")
+    header = jwt.encode(PAYLOADS[0], KEY, algorithm="HS256", headers={"kid": "1"})
+
+    assert service.decode_token(extra)["admin"] is True
+    assert service.decode_token(header)["uuid"] == PAYLOADS[0]["uuid"]
+    assert service.decode_token(_tamper(service.encode_token(PAYLOADS[0]))) is None
+
+
+def test_token_service_tokens_identical_between_codecs():
+    fast, slow = _token_service(True), _token_service(False)
+    for payload in PAYLOADS:
+        assert fast.encode_token(payload) == slow.encode_token(payload)
+        assert fast.decode_token(slow.encode_token(payload)) == slow.decode_token(
+            fast.encode_token(payload)
+        )
@@ -0,0 +1,211 @@
+"""
+Revogação por epochs: "sair de todos", revogação por usuário e global
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from src.infrastructure.database.models import sessions
+from src.infrastructure.database.models import token_epochs as token_epochs_table
+from src.infrastructure.database.session import engine
+from src.infrastructure.database.token_epochs import token_epochs
+from src.infrastructure.events.revocations import revocation_notifier
+
+CURRENT_USER = "query { current_user { email } }"
+REVOKE_USER = "mutation ($uuid: UUID!) { revoke_user_tokens(user_uuid: $uuid) }"
+REVOKE_ALL = "mutation ($before: DateTime) { revoke_all_tokens(before: $before) }"
+
+# Access token expirado: a próxima requisição usa o refresh token
+EXPIRED = datetime.now(timezone.utc) - timedelta(minutes=5)
+
+
+@pytest.fixture
+def no_global_epoch(app):
+    """Remove o epoch global (banco e cache) antes do teste"""
+    with engine.begin() as conn:
+        conn.execute(delete(token_epochs_table))
+    token_epochs.refresh()
+
+
+def _is_authenticated(graphql, client) -> bool:
+    data, _ = graphql(client, CURRENT_USER)
+    return data is not None
+
+
+def test_logout_everywhere(graphql, create_user, login):
+    email, _ = create_user()
+    first, second = login(email), login(email)
+
+    assert graphql(first, "mutation { logout_everywhere }")[0] == {
+        "logout_everywhere": True
+    }
+
+    data, errors = graphql(second, CURRENT_USER)
+    assert data is None
+    assert errors == [("User not found or session invalid", "UNAUTHORIZED")]
+
+    # Login logo depois da revogação é uma sessão nova e válida
+    assert _is_authenticated(graphql, login(email))
+
+
+def test_revoke_user_tokens_requires_admin(graphql, create_user, login):
+    email, user_uuid = create_user()
+    user = login(email)
+
+    data, errors = graphql(user, REVOKE_USER, {"uuid": str(user_uuid)})
+    assert data is None
+    assert errors == [("Admin role required", "FORBIDDEN")]
+    assert _is_authenticated(graphql, user)
+
+
+def test_revoke_user_tokens(graphql, create_user, login):
+    admin_email, _ = create_user(role="admin")
+    email, user_uuid = create_user()
+    admin, user = login(admin_email), login(email)
+
+    data, _ = graphql(admin, REVOKE_USER, {"uuid": str(user_uuid)})
+    assert data == {"revoke_user_tokens": True}
+
+    assert not _is_authenticated(graphql, user)
+    assert _is_authenticated(graphql, admin)
+    assert _is_authenticated(graphql, login(email))
+
+
+def test_revoke_all_tokens_requires_admin(graphql, create_user, login):
+    email, _ = create_user()
+
+    data, errors = graphql(login(email), REVOKE_ALL)
+    assert data is None
+    assert errors == [("Admin role required", "FORBIDDEN")]
+
+    anonymous = login(email)
+    anonymous.cookies.clear()
+    data, errors = graphql(anonymous, REVOKE_ALL)
+    assert errors == [("Authentication cookie missing or invalid", "UNAUTHORIZED")]
+
+
+def test_revoke_all_tokens(graphql, create_user, login, no_global_epoch):
+    admin_email, _ = create_user(role="admin")
+    email, _ = create_user()
+    admin, user = login(admin_email), login(email)
+
+    data, _ = graphql(admin, REVOKE_ALL)
+    assert data["revoke_all_tokens"]
+
+    for client in (admin, user):
+        data, errors = graphql(client, CURRENT_USER)
+        assert data is None
+        assert errors == [("Token revoked", "UNAUTHORIZED")]
+
+    assert _is_authenticated(graphql, login(email))
+    assert _is_authenticated(graphql, login(admin_email))
+
+
+def test_global_epoch_never_moves_backwards(
+    graphql, create_user, login, reencode, no_global_epoch
+):
+    admin_email, _ = create_user(role="admin")
+    email, _ = create_user()
+
+    data, _ = graphql(login(admin_email), REVOKE_ALL)
+    epoch = datetime.fromisoformat(data["revoke_all_tokens"])
+    revoked = login(email)
+    reencode(revoked, auth_time=(epoch - timedelta(seconds=1)).timestamp())
+
+    last_week = (epoch - timedelta(days=7)).isoformat()
+    data, _ = graphql(login(admin_email), REVOKE_ALL, {"before": last_week})
+    assert datetime.fromisoformat(data["revoke_all_tokens"]) == epoch
+
+    with engine.connect() as conn:
+        stored = conn.execute(select(token_epochs_table.c.valid_after)).scalar_one()
+    assert stored.replace(tzinfo=timezone.utc) == epoch
+
+    # Tokens anteriores ao primeiro incidente continuam revogados
+    token_epochs.refresh()
+    assert not _is_authenticated(graphql, revoked)
+
+    future = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    data, errors = graphql(login(admin_email), REVOKE_ALL, {"before": future})
+    assert data is None
+    assert errors == [("A data de revogação não pode estar no futuro", None)]
+
+
+def test_refresh_works_before_revocation(graphql, create_user, login, reencode):
+    email, _ = create_user()
+    client = login(email)
+
+    reencode(client, exp=EXPIRED)
+    assert _is_authenticated(graphql, client)
+
+
+def test_refresh_blocked_after_user_epoch(graphql, create_user, login, reencode):
+    email, _ = create_user()
+    revoked, survivor = login(email), login(email)
+
+    graphql(survivor, "mutation { logout_everywhere }")
+
+    reencode(revoked, exp=EXPIRED)
+    data, errors = graphql(revoked, CURRENT_USER)
+    assert data is None
+    assert errors == [("Failed to refresh token", "UNAUTHORIZED")]
+
+
+def test_refresh_blocked_after_global_epoch(
+    graphql, create_user, login, reencode, no_global_epoch
+):
+    admin_email, _ = create_user(role="admin")
+    email, _ = create_user()
+    user = login(email)
+
+    graphql(login(admin_email), REVOKE_ALL)
+
+    reencode(user, exp=EXPIRED)
+    data, errors = graphql(user, CURRENT_USER)
+    assert data is None
+    assert errors == [("Token revoked", "UNAUTHORIZED")]
+
+
+def test_token_without_auth_time(
+    graphql, create_user, login, reencode, no_global_epoch
+):
+    admin_email, _ = create_user(role="admin")
+    email, _ = create_user()
+    legacy = login(email)
+    reencode(legacy, auth_time=None)
+
+    # Sem epoch global, tokens antigos (sem auth_time) seguem válidos
+    assert _is_authenticated(graphql, legacy)
+
+    # Contam como auth_time 0: qualquer epoch global os revoga
+    graphql(login(admin_email), REVOKE_ALL)
+    data, errors = graphql(legacy, CURRENT_USER)
+    assert errors == [("Token revoked", "UNAUTHORIZED")]
+
+
+def test_user_epoch_notifies_open_websockets(graphql, create_user, login):
+    email, user_uuid = create_user()
+    client = login(email)
+    with engine.connect() as conn:
+        session_uuids = (
+            conn.execute(
+                select(sessions.c.uuid).where(sessions.c.user_uuid == user_uuid)
+            )
+            .scalars()
+            .all()
+        )
+
+    async def subscribe():
+        return [revocation_notifier.subscribe(uuid) for uuid in session_uuids]
+
+    # Conexões abertas esperando no event loop delas
+    loop = asyncio.new_event_loop()
+    events = loop.run_until_complete(subscribe())
+    try:
+        graphql(client, "mutation { logout_everywhere }")
+        loop.run_until_complete(asyncio.sleep(0))
+        assert events and all(event.is_set() for event in events)
+    finally:
+        for session_uuid, event in zip(session_uuids, events):
+            revocation_notifier.unsubscribe(session_uuid, event)
+        loop.close()
@@ -0,0 +1,124 @@
+"""
+Unidade de trabalho: nenhuma conexão retida entre blocos de trabalho
+"""
+
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import delete, insert, select
+from src.infrastructure.database import session as database_session
+from src.infrastructure.database.models import token_epochs
+from src.infrastructure.database.session import (
+    engine,
+    primary_read_engine,
+    get_session,
+    on_commit,
+    unit_of_work,
+)
+
+SCOPE = "unit-of-work-test"
+
+
+def _checked_out() -> int:
+    return engine.pool.checkedout() + primary_read_engine.pool.checkedout()
+
+
+@pytest.fixture
+def clean_scope(app):
+    yield
+    with engine.begin() as conn:
+        conn.execute(delete(token_epochs).where(token_epochs.c.scope == SCOPE))
+
+
+def test_read_block_releases_connection(app):
+    with unit_of_work():
+        with get_session() as session:
+            session.execute(select(token_epochs)).all()
+            assert _checked_out() == 1
+
+        # Entre blocos (um await na requisição) a conexão está no pool
+        assert _checked_out() == 0
+
+        with get_session() as session:
+            with get_session() as inner:
+                inner.execute(select(token_epochs)).all()
+            # Blocos aninhados seguem na mesma transação
+            assert _checked_out() == 1
+        assert _checked_out() == 0
+
+
+def test_write_block_commits_and_releases_writer(clean_scope):
+    with unit_of_work():
+        with get_session() as session:
+            session.execute(
+                insert(token_epochs).values(
+                    scope=SCOPE, valid_after=datetime.now(timezone.utc)
+                )
+            )
+        assert _checked_out() == 0
+
+        # Outra conexão já enxerga a escrita confirmada
+        with primary_read_engine.connect() as conn:
+            assert conn.execute(
+                select(token_epochs).where(token_epochs.c.scope == SCOPE)
+            ).first()
+
+
+def test_failed_block_discards_only_its_writes(clean_scope):
+    with unit_of_work():
+        with pytest.raises(ValueError):
+            with get_session() as session:
+                session.execute(
+                    insert(token_epochs).values(
+                        scope=SCOPE, valid_after=datetime.now(timezone.utc)
+                    )
+                )
+                raise ValueError
+        assert _checked_out() == 0
+
+        with get_session() as session:
+            assert (
+                session.execute(
+                    select(token_epochs).where(token_epochs.c.scope == SCOPE)
+                ).first()
+                is None
+            )
+
+
+def test_on_commit_waits_for_the_unit_of_work_commit(clean_scope, monkeypatch):
+    # Fora do SQLite as escritas só são confirmadas no fim da requisição
+    monkeypatch.setattr(database_session, "SINGLE_WRITER", False)
+    calls = []
+
+    with unit_of_work():
+        with get_session() as session:
+            session.execute(
+                insert(token_epochs).values(
+                    scope=SCOPE, valid_after=datetime.now(timezone.utc)
+                )
+            )
+            on_commit(session, lambda: calls.append("committed"))
+
+        with pytest.raises(ValueError):
+            with get_session() as session:
+                on_commit(session, lambda: calls.append("rolled back"))
+                raise ValueError
+        assert calls == []
+
+    assert calls == ["committed"]
+
+
+def test_on_commit_discarded_on_rollback(app):
+    calls = []
+
+    with pytest.raises(ValueError):
+        with unit_of_work():
+            with get_session() as session:
+                session.execute(
+                    insert(token_epochs).values(
+                        scope=SCOPE, valid_after=datetime.now(timezone.utc)
+                    )
+                )
+                on_commit(session, lambda: calls.append("committed"))
+                raise ValueError
+
+    assert calls == []
@@ -0,0 +1,62 @@
+"""
+Websockets: autenticação e revalidação da sessão fora do event loop
+"""
+
+import uuid
+import asyncio
+from types import SimpleNamespace
+from src.presentation.graphql import router
+from src.presentation.graphql.router import RequestScopedGraphQLRouter
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _graphql_router() -> RequestScopedGraphQLRouter:
+    # Os métodos testados não usam o schema nem o estado do router
+    return RequestScopedGraphQLRouter.__new__(RequestScopedGraphQLRouter)
+
+
+def test_connection_authenticated_off_the_event_loop(monkeypatch):
+    calls = []
+
+    def authenticate_connection(context):
+        calls.append(_on_event_loop())
+        context.session_uuid = None
+
+    monkeypatch.setattr(router, "authenticate_connection", authenticate_connection)
+
+    asyncio.run(_graphql_router().on_ws_connect(SimpleNamespace()))
+    assert calls == [False]
+
+
+def test_session_revalidated_off_the_event_loop(monkeypatch):
+    calls = []
+
+    def is_session_active(session_uuid, user_uuid):
+        calls.append(_on_event_loop())
+        return len(calls) < 2
+
+    monkeypatch.setattr(router, "is_session_active", is_session_active)
+
+    closed = []
+
+    async def close(code, reason):
+        closed.append(code)
+
+    context = SimpleNamespace(
+        settings=SimpleNamespace(ws_revalidate_seconds=0.01),
+        session_uuid=uuid.uuid4(),
+        user=SimpleNamespace(uuid=uuid.uuid4()),
+        request=SimpleNamespace(close=close),
+    )
+    asyncio.run(_graphql_router().watch_session(context))
+
+    assert calls == [False, False]
+    assert closed == [router.SESSION_REVOKED]
+    assert context.authenticated is False